@@ -0,0 +1,254 @@
+import hashlib
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+import identity
+from facets import parse_filters, facet_counts, browse_query
+from models import db, Venue, Artist, Show
+from pagination import get_limit, paginate
+from queries import upcoming_show_counts, show_listing, venue_shows, artist_shows, split_by_time
+from search import search_by_name
+
+
+# Versioned JSON API for the mobile client.
+# List endpoints stream every row as NDJSON (one JSON object per line) from a
+# server-side cursor, so a full export never holds the table in memory.
+# Detail and search responses carry an ETag and answer a matching
+# If-None-Match with 304 Not Modified. For venue/artist details the ETag is
+# derived from one row of timestamps and counters (detail_version) before the
+# payload is built, so a 304 costs a single query; search and browse results
+# have no such version and are hashed after building.
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+STREAM_BATCH_SIZE = 1000
+
+VENUE_FIELDS = ('id', 'name', 'city', 'state', 'address', 'phone', 'genres',
+                'image_link', 'facebook_link', 'website_link',
+                'seeking_talent', 'seeking_description')
+ARTIST_FIELDS = ('id', 'name', 'city', 'state', 'phone', 'genres',
+                 'image_link', 'facebook_link', 'website_link',
+                 'seeking_venue', 'seeking_description')
+
+
+def to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def serialize(obj, fields):
+    data = {field: getattr(obj, field) for field in fields}
+    if 'genres' in data:
+        data['genres'] = list(data['genres'])
+    return data
+
+
+def serialize_show(row):
+    return {
+        "id": row.id,
+        "start_time": row.start_time,
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+    }
+
+
+def ndjson(query, serializer):
+    # yield_per streams from a server-side cursor on Postgres
+    def generate():
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield json.dumps(serializer(row), default=to_json) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def conditional_json(payload, etag=None):
+    body = json.dumps(payload, default=to_json, sort_keys=True)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag or hashlib.sha1(body.encode('utf-8')).hexdigest())
+    return response.make_conditional(request)
+
+
+def not_modified(etag):
+    # The 304 for a client that already holds this version, or None
+    if not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+# model: (its column on shows, the counterpart's column, the counterpart)
+DETAIL_SHOWS = {
+    Venue: (Show.venue_id, Show.artist_id, Artist),
+    Artist: (Show.artist_id, Show.venue_id, Venue),
+}
+
+
+def detail_version(model, entity_id):
+    # Version of a venue/artist detail payload, or None if there is no such
+    # row. Covers edits to the row itself (updated_at, which genre changes
+    # bump too), shows added, moved or removed (the counters), edits to its
+    # shows and to the venues/artists they list (their newest updated_at),
+    # and a show starting before the sweep has recounted (next_show_at).
+    owner, other_id, other = DETAIL_SHOWS[model]
+    shows_at = select(func.max(Show.updated_at)).where(owner == model.id).scalar_subquery()
+    others_at = select(func.max(other.updated_at)).join(
+        Show, other_id == other.id).where(owner == model.id).scalar_subquery()
+    row = db.session.query(model.updated_at, model.upcoming_show_count, model.past_show_count,
+                           model.next_show_at, shows_at, others_at).filter(
+        model.id == entity_id).first()
+    if row is None:
+        return None
+    started = row.next_show_at is not None and row.next_show_at <= datetime.now()
+    key = repr((model.__tablename__, entity_id, tuple(row), started))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def shows_payload(shows, counterpart):
+    past, upcoming = split_by_time(shows)
+    fields = [f'{counterpart}_id', f'{counterpart}_name', f'{counterpart}_image_link']
+
+    def show_data(show):
+        data = {field: getattr(show, field) for field in fields}
+        data["start_time"] = show.start_time
+        return data
+
+    return {
+        "past_shows": [show_data(show) for show in past],
+        "upcoming_shows": [show_data(show) for show in upcoming],
+        "past_shows_count": len(past),
+        "upcoming_shows_count": len(upcoming),
+    }
+
+
+def search_payload(model):
+    hits = search_by_name(model, request.args.get('q', '').strip())
+    upcoming = upcoming_show_counts(model, [hit.id for hit in hits])
+    return {
+        "count": len(hits),
+        "data": [{
+            "id": hit.id,
+            "name": hit.name,
+            "num_upcoming_shows": upcoming.get(hit.id, 0),
+        } for hit in hits],
+    }
+
+
+def browse_payload(model):
+    filters = parse_filters(request.args)
+    limit = get_limit(request.args, current_app.config['PAGE_SIZE'],
+                      current_app.config['MAX_PAGE_SIZE'])
+    page = paginate(browse_query(model, filters), model.name, model.id,
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    limit=limit)
+    facets = facet_counts(model, filters)
+    return {
+        "count": facets.total,
+        "facets": {
+            "genre": [{"id": row.id, "name": row.name, "count": row.total}
+                      for row in facets.genres],
+            "city": [{"city": row.city, "state": row.state, "count": row.total}
+                     for row in facets.cities],
+            "seeking": [{"value": row.seeking, "count": row.total}
+                        for row in facets.seeking],
+        },
+        "data": [{"id": row.id, "name": row.name, "city": row.city, "state": row.state}
+                 for row in page.items],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+def list_venues():
+    return ndjson(Venue.query.options(selectinload(Venue.genre_list)).order_by(Venue.id),
+                  lambda venue: serialize(venue, VENUE_FIELDS))
+
+
+@api.route('/venues/browse')
+def browse_venues():
+    return conditional_json(browse_payload(Venue))
+
+
+@api.route('/venues/search')
+def search_venues():
+    return conditional_json(search_payload(Venue))
+
+
+@api.route('/venues/<int:venue_id>')
+def get_venue(venue_id):
+    version = detail_version(Venue, venue_id)
+    if version is None:
+        abort(404)
+    unchanged = not_modified(version)
+    if unchanged is not None:
+        return unchanged
+    venue = identity.get(Venue, venue_id)
+    payload = serialize(venue, VENUE_FIELDS)
+    payload.update(shows_payload(venue_shows(venue_id), 'artist'))
+    return conditional_json(payload, etag=version)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+def list_artists():
+    return ndjson(Artist.query.options(selectinload(Artist.genre_list)).order_by(Artist.id),
+                  lambda artist: serialize(artist, ARTIST_FIELDS))
+
+
+@api.route('/artists/browse')
+def browse_artists():
+    return conditional_json(browse_payload(Artist))
+
+
+@api.route('/artists/search')
+def search_artists():
+    return conditional_json(search_payload(Artist))
+
+
+@api.route('/artists/<int:artist_id>')
+def get_artist(artist_id):
+    version = detail_version(Artist, artist_id)
+    if version is None:
+        abort(404)
+    unchanged = not_modified(version)
+    if unchanged is not None:
+        return unchanged
+    artist = identity.get(Artist, artist_id)
+    payload = serialize(artist, ARTIST_FIELDS)
+    payload.update(shows_payload(artist_shows(artist_id), 'venue'))
+    return conditional_json(payload, etag=version)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+def list_shows():
+    return ndjson(show_listing().order_by(Show.start_time, Show.id), serialize_show)
+
+
+@api.route('/shows/<int:show_id>')
+def get_show(show_id):
+    show = show_listing().filter(Show.id == show_id).first()
+    if show is None:
+        abort(404)
+    return conditional_json(serialize_show(show))
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return jsonify({"error": "not found"}), 404
@@ -5,6 +5,7 @@
 
 import dateutil.parser
 import babel
+import babel.dates
 from flask import Flask, render_template, request, flash, redirect, url_for, abort, jsonify
 from flask_moment import Moment
 
@@ -18,7 +19,22 @@ from datetime import datetime
 
 from operator import itemgetter  # for sorting lists of tuples
 import collections
-from models import db_setup, Venue, Show, Artist
+from models import db_setup, Venue, Show, Artist, Genre, venue_genre_table, artist_genre_table
+from pagination import get_limit, paginate
+from search import search_by_name
+from queries import upcoming_show_counts, show_listing, detail, genre_facets
+from cache import ResponseCache
+from profiling import Profiler
+from request_log import RequestLog
+from db_pool import pool_stats
+from api import api
+from importer import import_command
+from exporter import export_command
+from facets import parse_filters, facet_counts, browse_query, rebuild_facets_command
+import show_counts
+import identity
+import template_cache
+import assets
 
 
 #
@@ -31,6 +47,16 @@ app = Flask(__name__)
 moment = Moment(app)
 
 db = db_setup(app)
+response_cache = ResponseCache(app)
+profiler = Profiler(app)
+request_log = RequestLog(app)
+app.register_blueprint(api)
+app.cli.add_command(import_command)
+app.cli.add_command(export_command)
+app.cli.add_command(rebuild_facets_command)
+app.cli.add_command(show_counts.sweep_command)
+app.cli.add_command(assets.build_assets_command)
+assets.init_app(app)
 
 
 #----------------------------------------------------------------------------#
@@ -43,17 +69,89 @@ db = db_setup(app)
 #----------------------------------------------------------------------------#
 
 
+# Babel patterns are parsed once here rather than on every call
+DATETIME_FORMATS = {
+    'full': babel.dates.parse_pattern("EEEE MMMM, d, y 'at' h:mma"),
+    'medium': babel.dates.parse_pattern("EE MM, dd, y h:mma"),
+}
+DATETIME_LOCALE = babel.Locale.parse('en')
+
+
 def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+    # Views pass datetime objects; strings are still accepted but need parsing
+    if not isinstance(value, datetime):
+        value = dateutil.parser.parse(value)
+    pattern = DATETIME_FORMATS.get(format)
+    if pattern is None:
+        return babel.dates.format_datetime(value, format, locale='en')
+    return pattern.apply(value, DATETIME_LOCALE)
 
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+
+def page_limit():
+    return get_limit(request.args, app.config['PAGE_SIZE'], app.config['MAX_PAGE_SIZE'])
+
+
+@ app.template_global()
+def page_url(**changes):
+    # URL of the current page with some query arguments replaced (None drops
+    # one); changing anything but the cursor starts again from the first page
+    args = request.args.to_dict()
+    args.pop('after', None)
+    args.pop('before', None)
+    args.update(changes)
+    args.update(request.view_args)
+    return url_for(request.endpoint, **{k: v for k, v in args.items() if v is not None})
+
+
+def related_page_tags(owner_column, owner_id, other_column, prefix):
+    # Cache tags of the counterpart detail pages (venue:<id> / artist:<id>)
+    # that list a show of this artist/venue
+    rows = db.session.query(other_column).filter(
+        owner_column == owner_id).distinct()
+    return [f'{prefix}:{other_id}' for (other_id,) in rows]
+
+
+def venue_areas(genre_id=None):
+    # A page of venues (optionally of one genre) with their upcoming-show
+    # counters, bucketed into city/state areas
+    query = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_show_count.label('num_upcoming_shows'))
+    if genre_id is not None:
+        query = query.join(
+            venue_genre_table, venue_genre_table.c.venues_id == Venue.id).filter(
+            venue_genre_table.c.genres_id == genre_id)
+
+    page = paginate(query, Venue.name, Venue.id,
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    limit=page_limit())
+
+    areas = {}
+    for venue in page.items:
+        areas.setdefault((venue.city, venue.state), []).append({
+            "id": venue.id,
+            "name": venue.name,
+            "num_upcoming_shows": venue.num_upcoming_shows
+        })
+
+    data = []
+    for loc in sorted(areas, key=itemgetter(1, 0)):
+        data.append({
+            "city": loc[0],
+            "state": loc[1],
+            "venues": areas[loc]
+        })
+
+    return data, page
+
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -68,49 +166,11 @@ def index():
 #  ----------------------------------------------------------------
 
 @ app.route('/venues')
+@ response_cache.cached('venues')
 def venues():
     # TODO: replace with real venues data.
 
-    venues = Venue.query.all()
-
-    data = []
-
-    cities_states = set()
-    for venue in venues:
-        cities_states.add((venue.city, venue.state))
-
-    cities_states = list(cities_states)
-
-    cities_states.sort(key=itemgetter(1, 0))
-
-    now = datetime.now()
-
-    # Now iterate over the unique values to seed the data dictionary with city/state locations
-    for loc in cities_states:
-        # For this location, see if there are any venues there, and add if so
-        venues_list = []
-        for venue in venues:
-            if (venue.city == loc[0]) and (venue.state == loc[1]):
-
-                # If we've got a venue to add, check how many upcoming shows it has
-                venue_shows = Show.query.filter_by(venue_id=venue.id).all()
-                num_upcoming = 0
-                for show in venue_shows:
-                    if show.start_time > now:
-                        num_upcoming += 1
-
-                venues_list.append({
-                    "id": venue.id,
-                    "name": venue.name,
-                    "num_upcoming_shows": num_upcoming
-                })
-
-        # After all venues are added to the list for a given location, add it to the data dictionary
-        data.append({
-            "city": loc[0],
-            "state": loc[1],
-            "venues": venues_list
-        })
+    data, page = venue_areas()
 
     #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
     # data = [{
@@ -134,7 +194,7 @@ def venues():
     #         "num_upcoming_shows": 0,
     #     }]
     # }]
-    return render_template('pages/venues.html', areas=data)
+    return render_template('pages/venues.html', areas=data, page=page)
 
 
 @ app.route('/venues/search', methods=['POST'])
@@ -145,43 +205,37 @@ def search_venues():
 
     # Use filter, not filter_by when doing LIKE search (i=insensitive to case)
     # Wildcards search before and after
-    venues = Venue.query.filter(
-        Venue.name.ilike('%' + search_term + '%')).all()
-    print(venues)
+    venues = search_by_name(Venue, search_term)
+    upcoming = upcoming_show_counts(Venue, [venue.id for venue in venues])
+
     venue_list = []
-    now = datetime.now()
     for venue in venues:
-        venue_shows = Show.query.filter_by(venue_id=venue.id).all()
-        num_upcoming = 0
-        for show in venue_shows:
-            if show.start_time > now:
-                num_upcoming += 1
-
         venue_list.append({
             "id": venue.id,
             "name": venue.name,
-            "num_upcoming_shows": num_upcoming  # FYI, template does nothing with this
+            "num_upcoming_shows": upcoming.get(venue.id, 0)  # FYI, template does nothing with this
         })
-        # seach for Hop should return "The Musical Hop".
-        # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-        response = {
-            "count": len(venues),
-            "data": venue_list
-        }
+    # seach for Hop should return "The Musical Hop".
+    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+    response = {
+        "count": len(venues),
+        "data": venue_list
+    }
 
-        # response = {
-        #     "count": 1,
-        #     "data": [{
-        #         "id": 2,
-        #         "name": "The Dueling Pianos Bar",
-        #         "num_upcoming_shows": 0,
-        #     }]
-        # }
+    # response = {
+    #     "count": 1,
+    #     "data": [{
+    #         "id": 2,
+    #         "name": "The Dueling Pianos Bar",
+    #         "num_upcoming_shows": 0,
+    #     }]
+    # }
 
-        return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+    return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 
 @ app.route('/venues/<int:venue_id>')
+@ response_cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
 
     data = {}
@@ -192,52 +246,22 @@ def show_venue(venue_id):
     # Returns object by primary key, or None
     try:
 
-        requested_venue = Venue.query.get(venue_id)
+        # The venue, its genres and its past and upcoming shows (with their
+        # artist); fetched concurrently when CONCURRENT_DETAIL_QUERIES is on
+        requested_venue, genres, past, upcoming = detail(
+            Venue, venue_id, app.config['CONCURRENT_DETAIL_QUERIES'],
+            app.config['DETAIL_QUERY_THREADS'])
 
         if requested_venue is None:
             return not_found_error(404)
 
-        genres = []
-        for item in requested_venue.genres:
-            genres.append(item)
-
-        shows = Show.query.filter_by(venue_id=venue_id)
-
-        today = datetime.now()
-
-        raw_past_shows = db.session.query(Show).join(Venue).filter(
-            Show.venue_id == venue_id).filter(Show.start_time < datetime.now()).all()
-        past_shows = []
-
-        for show in raw_past_shows:
-            artist = Artist.query.get(show.artist_id)
-            show_data = {
-
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
-            past_shows.append(show_data)
-
-        raw_upcoming_shows = db.session.query(Show).join(Venue).filter(
-            Show.venue_id == venue_id).filter(Show.start_time > datetime.now()).all()
-        upcoming_shows = []
-        for show in raw_upcoming_shows:
-            artist = Artist.query.get(show.artist_id)
-            show_data = {
-
-                "artist_id": artist.id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
-            }
-            upcoming_shows.append(show_data)
+        past_shows = [show._asdict() for show in past]
+        upcoming_shows = [show._asdict() for show in upcoming]
 
         data = {
             "id": requested_venue.id,
             "name": requested_venue.name,
-            "genres": requested_venue.genres,
+            "genres": genres,
             "address": requested_venue.address,
             "city": requested_venue.city,
             "state": requested_venue.state,
@@ -388,6 +412,7 @@ def create_venue_submission():
             # we call on db object to create the connection
             db.session.add(venues)
             db.session.commit()
+            response_cache.invalidate('venues')
         else:
             error = True
             flash('Venue ' + request.form['name'] + ' Could not be updated!')
@@ -420,7 +445,7 @@ def create_venue_submission():
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
     # Deletes a venue based on AJAX call from the venue page
-    venue = Venue.query.get(venue_id)
+    venue = identity.get(Venue, venue_id)
     if not venue:
         # User somehow faked this call, redirect home
         return redirect(url_for('index'))
@@ -428,9 +453,12 @@ def delete_venue(venue_id):
         error_on_delete = False
         # Need to hang on to venue name since will be lost after delete
         venue_name = venue.name
+        stale_pages = ['venues', 'shows', f'venue:{venue.id}'] + related_page_tags(
+            Show.venue_id, venue.id, Show.artist_id, 'artist')
         try:
             db.session.delete(venue)
             db.session.commit()
+            response_cache.invalidate(*stale_pages)
         except:
             error_on_delete = True
             db.session.rollback()
@@ -454,8 +482,13 @@ def delete_venue(venue_id):
 
 
 @ app.route('/artists')
+@ response_cache.cached('artists')
 def artists():
-    artists = Artist.query.order_by(Artist.name).all()
+    page = paginate(db.session.query(Artist.id, Artist.name), Artist.name, Artist.id,
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    limit=page_limit())
+    artists = page.items
 
     data = []
     for artist in artists:
@@ -474,7 +507,7 @@ def artists():
     #     "id": 6,
     #     "name": "The Wild Sax Band",
     # }]
-    return render_template('pages/artists.html', artists=data)
+    return render_template('pages/artists.html', artists=data, page=page)
 
 
 @ app.route('/artists/search', methods=['POST'])
@@ -483,22 +516,16 @@ def search_artists():
     search_term = request.form.get('search_term', '').strip()
 
     # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-    artists = Artist.query.filter(
-        Artist.name.ilike('%' + search_term + '%')).all()
+    artists = search_by_name(Artist, search_term)
     # search for "band" should return "The Wild Sax Band".
+    upcoming = upcoming_show_counts(Artist, [artist.id for artist in artists])
+
     artist_list = []
-    now = datetime.now()
     for artist in artists:
-        artist_shows = Show.query.filter_by(artist_id=artist.id).all()
-        num_upcoming = 0
-        for show in artist_shows:
-            if show.start_time > now:
-                num_upcoming += 1
-
         artist_list.append({
             "id": artist.id,
             "name": artist.name,
-            "num_upcoming_shows": num_upcoming  # FYI, template does nothing with this
+            "num_upcoming_shows": upcoming.get(artist.id, 0)  # FYI, template does nothing with this
         })
 
     response = {
@@ -510,51 +537,27 @@ def search_artists():
 
 
 @ app.route('/artists/<int:artist_id>')
+@ response_cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
     data = {}
 
     try:
-        requested_artist = Artist.query.get(artist_id)
+        # The artist, its genres and its past and upcoming shows (with their
+        # venue); fetched concurrently when CONCURRENT_DETAIL_QUERIES is on
+        requested_artist, genres, past, upcoming = detail(
+            Artist, artist_id, app.config['CONCURRENT_DETAIL_QUERIES'],
+            app.config['DETAIL_QUERY_THREADS'])
 
         if requested_artist is None:
             return not_found_error(404)
 
-        genres = requested_artist.genres
-
-        shows = Show.query.filter_by(artist_id=artist_id)
-
-       # today = datetime.now()
-
-        raw_past_shows = db.session.query(Show).join(Venue).filter(
-            Show.artist_id == artist_id).filter(Show.start_time < datetime.now()).all()
-        past_shows = []
-        for show in raw_past_shows:
-            venue = Venue.query.get(show.venue_id)
-            show_data = {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
-            }
-            past_shows.append(show_data)
-
-        raw_upcoming_shows = db.session.query(Show).join(Venue).filter(
-            Show.artist_id == artist_id).filter(Show.start_time > datetime.now()).all()
-        upcoming_shows = []
-        for show in raw_upcoming_shows:
-            venue = Venue.query.get(show.venue_id)
-            show_data = {
-                "venue_id": venue.id,
-                "venue_name": venue.name,
-                "venue_image_link": venue.image_link,
-                "start_time": str(show.start_time),
-            }
-            upcoming_shows.append(show_data)
+        past_shows = [show._asdict() for show in past]
+        upcoming_shows = [show._asdict() for show in upcoming]
 
         data = {
             "id": requested_artist.id,
             "name": requested_artist.name,
-            "genres": requested_artist.genres,
+            "genres": genres,
             "city": requested_artist.city,
             "state": requested_artist.state,
             "phone": requested_artist.phone,
@@ -652,6 +655,68 @@ def show_artist(artist_id):
 
     return render_template('pages/show_artist.html', artist=data)
 
+#  Genres
+#  ----------------------------------------------------------------
+
+@ app.route('/genres')
+@ response_cache.cached('venues', 'artists')
+def genres():
+    # Venue and artist counts per genre, computed in SQL
+    return render_template('pages/genres.html', genres=genre_facets())
+
+
+@ app.route('/genres/<int:genre_id>/venues')
+@ response_cache.cached('venues')
+def genre_venues(genre_id):
+    genre = Genre.query.get_or_404(genre_id)
+    data, page = venue_areas(genre_id)
+    return render_template('pages/venues.html', areas=data, page=page,
+                           heading=f'{genre.name} venues')
+
+
+@ app.route('/genres/<int:genre_id>/artists')
+@ response_cache.cached('artists')
+def genre_artists(genre_id):
+    genre = Genre.query.get_or_404(genre_id)
+    query = db.session.query(Artist.id, Artist.name).join(
+        artist_genre_table, artist_genre_table.c.artists_id == Artist.id).filter(
+        artist_genre_table.c.genres_id == genre_id)
+    page = paginate(query, Artist.name, Artist.id,
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    limit=page_limit())
+    data = [{"id": artist.id, "name": artist.name} for artist in page.items]
+    return render_template('pages/artists.html', artists=data, page=page,
+                           heading=f'{genre.name} artists')
+
+
+#  Browse
+#  ----------------------------------------------------------------
+
+def browse_page(model, title):
+    # Venues/artists matching any combination of genre, city/state and
+    # seeking filters, with the facet counts from the summary table
+    filters = parse_filters(request.args)
+    page = paginate(browse_query(model, filters), model.name, model.id,
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    limit=page_limit())
+    return render_template('pages/browse.html', title=title, filters=filters,
+                           facets=facet_counts(model, filters), page=page)
+
+
+@ app.route('/venues/browse')
+@ response_cache.cached('venues')
+def browse_venues():
+    return browse_page(Venue, 'Venues')
+
+
+@ app.route('/artists/browse')
+@ response_cache.cached('artists')
+def browse_artists():
+    return browse_page(Artist, 'Artists')
+
+
 #  Update
 #  ----------------------------------------------------------------
 
@@ -660,7 +725,7 @@ def show_artist(artist_id):
 def edit_artist(artist_id):
     # Get the existing artist from the database
     # Returns object based on primary key, or None.  Guessing get is faster than filter_by
-    artist = Artist.query.get(artist_id)
+    artist = identity.get(Artist, artist_id)
     if not artist:
         # User typed in a URL that doesn't exist, redirect home
         return redirect(url_for('index'))
@@ -709,7 +774,7 @@ def edit_artist_submission(artist_id):
   # TODO: take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
     form = ArtistForm(request.form)
-    artist_data = Artist.query.get(artist_id)
+    artist_data = identity.get(Artist, artist_id)
     if artist_data:
         if form.validate():
             seeking_venue = False
@@ -729,6 +794,10 @@ def edit_artist_submission(artist_id):
             setattr(artist_data, 'image_link', request.form['image_link'])
             setattr(artist_data, 'seeking_description', seeking_description)
             setattr(artist_data, 'seeking_venue', seeking_venue)
+            db.session.commit()
+            response_cache.invalidate(
+                'artists', 'shows', f'artist:{artist_id}',
+                *related_page_tags(Show.artist_id, artist_id, Show.venue_id, 'venue'))
 
             return redirect(url_for('show_artist', artist_id=artist_id))
         else:
@@ -739,7 +808,7 @@ def edit_artist_submission(artist_id):
 @ app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
 
-    venue = Venue.query.get(venue_id)
+    venue = identity.get(Venue, venue_id)
     if not venue:
         # User typed in a URL that doesn't exist, redirect home
         return redirect(url_for('index'))
@@ -790,7 +859,7 @@ def edit_venue_submission(venue_id):
   # TODO: take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
     form = VenueForm(request.form)
-    venue_data = Venue.query.get(venue_id)
+    venue_data = identity.get(Venue, venue_id)
     if venue_data:
         if form.validate():
             seeking_talent = False
@@ -810,7 +879,10 @@ def edit_venue_submission(venue_id):
             setattr(venue_data, 'image_link', request.form['image_link'])
             setattr(venue_data, 'seeking_description', seeking_description)
             setattr(venue_data, 'seeking_talent', seeking_talent)
-           # Venue.update(venue_data)
+            db.session.commit()
+            response_cache.invalidate(
+                'venues', 'shows', f'venue:{venue_id}',
+                *related_page_tags(Show.venue_id, venue_id, Show.artist_id, 'artist'))
             return redirect(url_for('show_venue', venue_id=venue_id))
         else:
             print(form.errors)
@@ -862,6 +934,7 @@ def create_artist_submission():
             # we call on db object to create the connection
             db.session.add(artists)
             db.session.commit()
+            response_cache.invalidate('artists')
         else:
             error = True
             flash('Artist ' + request.form['name'] + ' Could not be updated!')
@@ -891,7 +964,7 @@ def create_artist_submission():
 def delete_artist(artist_id):
 
     # Deletes a artist based on AJAX call from the artist page
-    artist = Artist.query.get(artist_id)
+    artist = identity.get(Artist, artist_id)
     if not artist:
         # User somehow faked this call, redirect home
         return redirect(url_for('index'))
@@ -899,9 +972,12 @@ def delete_artist(artist_id):
         error_on_delete = False
         # Need to hang on to artist name since will be lost after delete
         artist_name = artist.name
+        stale_pages = ['artists', 'shows', f'artist:{artist.id}'] + related_page_tags(
+            Show.artist_id, artist.id, Show.venue_id, 'venue')
         try:
             db.session.delete(artist)
             db.session.commit()
+            response_cache.invalidate(*stale_pages)
         except:
             error_on_delete = True
             db.session.rollback()
@@ -924,26 +1000,31 @@ def delete_artist(artist_id):
 #  ----------------------------------------------------------------
 
 @ app.route('/shows')
+@ response_cache.cached('shows')
 def shows():
     # displays list of shows at /shows
 
     data = []
+    page = None
 
     try:
-        shows = Show.query.all()
+        # One joined query for the whole page, selecting only the columns
+        # the template uses, instead of two extra lookups per show
+        query = show_listing()
 
-        for show in shows:
-            venue_id = show.venue_id
-            artist_id = show.artist_id
-            artist = Artist.query.get(artist_id)
+        page = paginate(query, Show.start_time, Show.id,
+                        after=request.args.get('after'),
+                        before=request.args.get('before'),
+                        limit=page_limit())
 
+        for show in page.items:
             each_show_data = {
-                "venue_id": venue_id,
-                "venue_name": Venue.query.get(venue_id).name,
-                "artist_id": artist_id,
-                "artist_name": artist.name,
-                "artist_image_link": artist.image_link,
-                "start_time": str(show.start_time),
+                "venue_id": show.venue_id,
+                "venue_name": show.venue_name,
+                "artist_id": show.artist_id,
+                "artist_name": show.artist_name,
+                "artist_image_link": show.artist_image_link,
+                "start_time": show.start_time,
             }
 
             data.append(each_show_data)
@@ -955,7 +1036,7 @@ def shows():
 
     finally:
         db.session.close()
-    return render_template("pages/shows.html", shows=data)
+    return render_template("pages/shows.html", shows=data, page=page)
 
     # data = [{
     #     "venue_id": 1,
@@ -1008,11 +1089,12 @@ def create_shows():
 def create_show_submission():
     # called to create new shows in the db, upon submitting new show listing form
 
-    form = ShowForm()
+    form = ShowForm(request.form)
 
     artist_id = request.form.get('artist_id')
     venue_id = request.form.get('venue_id')
-    start_time = request.form.get('start_time')
+    # Parsed by the form; None (and so an error below) if it is not a date
+    start_time = form.start_time.data
 
     error_in_insert = False
 
@@ -1021,6 +1103,8 @@ def create_show_submission():
                         artist_id=artist_id, venue_id=venue_id)
         db.session.add(new_show)
         db.session.commit()
+        response_cache.invalidate(
+            'venues', 'shows', f'venue:{venue_id}', f'artist:{artist_id}')
 
     except Exception as e:
         error_in_insert = True
@@ -1041,6 +1125,24 @@ def create_show_submission():
     return render_template('pages/home.html')
 
 
+#  Monitoring
+#  ----------------------------------------------------------------
+#  Internal numbers: off (404) unless enabled in config.py
+
+@ app.route('/cache/stats')
+def cache_stats():
+    if not app.config.get('CACHE_STATS', False):
+        abort(404)
+    return jsonify(response_cache.counters())
+
+
+@ app.route('/db/stats')
+def db_stats():
+    if not app.config.get('DB_STATS', False):
+        abort(404)
+    return jsonify(pool_stats(db.engine))
+
+
 @ app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -1051,27 +1153,34 @@ def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
+# After the filters above: PRELOAD_TEMPLATES compiles every template here
+template_cache.init_app(app)
+
+
+def configure_logging(app):
+    # Called once by the entry points (wsgi.py, python app.py), not on import,
+    # so the CLI, tests and benchmarks do not open log files. LOG_FILE adds a
+    # file next to the default stderr output.
+    app.logger.setLevel(logging.INFO)
+    log_file = app.config.get('LOG_FILE')
+    if not log_file or any(getattr(h, 'baseFilename', None) == os.path.abspath(log_file)
+                           for h in app.logger.handlers):
+        return
+    file_handler = FileHandler(log_file)
     file_handler.setFormatter(
         Formatter(
             '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
-    app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
-    app.logger.info('errors')
 
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
-# Default port:
-if __name__ == '__main__':
-    app.run()
-
-# Or specify port manually:
-
+# Development server only; production runs wsgi.py under gunicorn
+# (see gunicorn.conf.py).
 if __name__ == '__main__':
+    configure_logging(app)
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    app.run(host=os.environ.get('HOST', '127.0.0.1'), port=port)
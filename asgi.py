@@ -0,0 +1,13 @@
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+
+
+# ASGI entry point, e.g.
+#
+#     uvicorn asgi:application --workers 4
+#
+# Flask itself stays synchronous: WsgiToAsgi runs each request in a worker
+# thread, so blocking database calls do not stall the event loop. Combine with
+# CONCURRENT_DETAIL_QUERIES=1 to overlap the reads of the venue/artist pages.
+application = WsgiToAsgi(app)
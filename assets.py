@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+import click
+from flask import current_app, request, send_file, url_for
+from flask.cli import with_appcontext
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+
+# Fingerprinted static assets. `flask build-assets` concatenates the CSS and
+# JS that layouts/main.html loads into a few bundles, minifies them, and
+# writes them and the other files it references (images, fonts named by the
+# CSS) to static/dist/ under content-hashed names, next to .gz and .br
+# (if the brotli package is installed) copies and a manifest.json.
+# Templates name assets through asset_url() / asset_urls(): with a manifest
+# they get /static/dist/ URLs, served precompressed with a one-year
+# Cache-Control: immutable, so repeat visits make no static requests at all.
+# Without a build they get the source files under /static, as before.
+# Old builds are kept so pages rendered before a deploy still find theirs.
+
+BUNDLES = {
+    'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                 'css/main.responsive.css', 'css/main.quickfix.css'],
+    # Run in <head>, before the page renders
+    'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    # Deferred, in this order, after the jQuery loaded in the page
+    'defer.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+
+FILES = ['img/front-splash.jpg', 'js/libs/jquery-1.11.1.min.js', 'js/libs/respond-1.4.2.min.js']
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 3600
+
+# Formats that are compressed already (images, woff) gain nothing
+COMPRESSIBLE = {'.css', '.js', '.svg', '.eot', '.ttf', '.otf', '.json', '.txt'}
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def fingerprinted(name, data):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def minify_css(css):
+    # Conservative: comments (but /*! licences) and whitespace only
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js, name):
+    # *.min.js are left alone; our own scripts lose indentation, blank lines
+    # and whole-line // comments. Source map comments would point nowhere.
+    lines = [line for line in js.splitlines() if not line.startswith('//# sourceMappingURL')]
+    if not name.endswith('.min.js'):
+        lines = [line.strip() for line in lines]
+        lines = [line for line in lines if line and not line.startswith('//')]
+    return '\n'.join(lines)
+
+
+class Builder(object):
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.dist = os.path.join(static_folder, DIST)
+        self.manifest = {}
+        self.written = 0
+
+    def write(self, name, data):
+        # Writes data under its fingerprinted name (plus compressed copies)
+        # and returns that name, relative to dist/
+        target = fingerprinted(name, data)
+        path = os.path.join(self.dist, target)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            if os.path.splitext(name)[1] in COMPRESSIBLE:
+                for suffix, compressed in compress(data):
+                    if len(compressed) < len(data):
+                        with open(path + suffix, 'wb') as f:
+                            f.write(compressed)
+            self.written += 1
+        self.manifest[name] = target
+        return target
+
+    def add_file(self, name):
+        if name not in self.manifest:
+            with open(os.path.join(self.static_folder, name), 'rb') as f:
+                self.write(name, f.read())
+        return self.manifest[name]
+
+    def css_source(self, name):
+        # The file's url()s pointed at dist/ copies, relative to the bundle
+        # (which lands in dist/); missing files keep pointing at /static
+        with open(os.path.join(self.static_folder, name), encoding='utf-8') as f:
+            css = f.read()
+
+        def rewrite(match):
+            url = match.group(2)
+            if re.match(r'^(data:|[a-z]+:|//|/|#)', url):
+                return match.group(0)
+            path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+            referenced = os.path.normpath(os.path.join(os.path.dirname(name), path))
+            if os.path.isfile(os.path.join(self.static_folder, referenced)):
+                return f'url("{self.add_file(referenced)}{suffix}")'
+            return f'url("../{referenced}{suffix}")'
+
+        return CSS_URL.sub(rewrite, css)
+
+    def build(self):
+        for name in FILES:
+            self.add_file(name)
+        for bundle, sources in BUNDLES.items():
+            if bundle.endswith('.css'):
+                data = '\n'.join(minify_css(self.css_source(name)) for name in sources)
+            else:
+                parts = []
+                for name in sources:
+                    with open(os.path.join(self.static_folder, name), encoding='utf-8') as f:
+                        parts.append(minify_js(f.read(), name))
+                # A file without a trailing semicolon must not run into the next
+                data = '\n;\n'.join(parts)
+            self.write(bundle, data.encode('utf-8'))
+        with open(os.path.join(self.dist, MANIFEST), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return self.manifest
+
+
+def compress(data):
+    yield '.gz', gzip.compress(data, 9, mtime=0)
+    try:
+        import brotli
+    except ImportError:
+        return
+    yield '.br', brotli.compress(data, quality=11)
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def asset_urls(name):
+    # URLs of a bundle (BUNDLES) or a single file under static/
+    manifest = current_app.extensions['assets']
+    if manifest and name in manifest:
+        return [url_for('assets', filename=manifest[name])]
+    return [url_for('static', filename=source) for source in BUNDLES.get(name, [name])]
+
+
+def asset_url(name):
+    return asset_urls(name)[0]
+
+
+def send_asset(filename):
+    directory = os.path.join(current_app.static_folder, DIST)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+    response = send_file(path, mimetype=mimetype, max_age=MAX_AGE, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.add_url_rule(f'{app.static_url_path}/{DIST}/<path:filename>', 'assets', send_asset)
+    app.add_template_global(asset_url)
+    app.add_template_global(asset_urls)
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Bundle, fingerprint and precompress the static assets into static/dist."""
+    builder = Builder(current_app.static_folder)
+    manifest = builder.build()
+    click.echo(f'{len(manifest)} assets, {builder.written} new files in {builder.dist}')
+    click.echo('Restart the app to serve them.')
@@ -0,0 +1,103 @@
+"""Measure a fresh worker's time to first byte on its first page requests.
+
+Starts a single gunicorn sync worker per run, waits until it answers
+/cache/stats (JSON, no template), then requests /venues, /artists and /shows
+once each and records each one's time to first byte. Runs every mode
+--runs times and prints the medians:
+
+    none      no bytecode cache, templates compiled on first use
+    bytecode  bytecode cache already filled by an earlier worker
+    preload   PRELOAD_TEMPLATES, no bytecode cache
+    both      PRELOAD_TEMPLATES with a filled bytecode cache
+
+"ready" is the time from spawning gunicorn until the worker answers; preloading
+moves compile time there, and the bytecode cache shrinks it.
+
+    $ python benchmarks/cold_start.py --database-url postgresql://.../fyyur_bench
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from serving_modes import ROOT
+
+
+PAGES = ['/venues', '/artists', '/shows']
+
+MODES = {
+    'none': {'TEMPLATE_BYTECODE_CACHE': '0', 'PRELOAD_TEMPLATES': '0'},
+    'bytecode': {'TEMPLATE_BYTECODE_CACHE': '1', 'PRELOAD_TEMPLATES': '0'},
+    'preload': {'TEMPLATE_BYTECODE_CACHE': '0', 'PRELOAD_TEMPLATES': '1'},
+    'both': {'TEMPLATE_BYTECODE_CACHE': '1', 'PRELOAD_TEMPLATES': '1'},
+}
+
+
+def ttfb(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    started = time.perf_counter()
+    conn.request('GET', path)
+    response = conn.getresponse()  # status line and headers received
+    elapsed = time.perf_counter() - started
+    response.read()
+    conn.close()
+    if response.status != 200:
+        raise SystemExit(f'{path} returned {response.status}')
+    return elapsed
+
+
+def cold_start(env, port, timeout=30):
+    # Returns (seconds until the worker answers, {page: seconds to first byte})
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        ['gunicorn', '--workers', '1', '--worker-class', 'sync', '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f'server exited with {process.returncode}')
+            if time.perf_counter() - started > timeout:
+                raise SystemExit('server did not start')
+            try:
+                ttfb(port, '/cache/stats')
+                break
+            except OSError:
+                time.sleep(0.01)
+        ready = time.perf_counter() - started
+        return ready, {page: ttfb(port, page) for page in PAGES}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8767)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url (or DATABASE_URL) is required')
+
+    print(f'{"mode":9} {"ready ms":>9}' + ''.join(f'{page + " ms":>14}' for page in PAGES))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        base_env = dict(os.environ, DATABASE_URL=args.database_url, CACHE_TYPE='null',
+                        CACHE_STATS='1', TEMPLATE_BYTECODE_CACHE_DIR=cache_dir)
+        base_env.pop('REQUEST_LOG_FILE', None)
+        # Fill the bytecode cache the way the first worker after a deploy would
+        cold_start(dict(base_env, **MODES['both']), args.port)
+        for mode in args.modes:
+            runs = [cold_start(dict(base_env, **MODES[mode]), args.port) for _ in range(args.runs)]
+            ready = statistics.median(r for r, _ in runs)
+            pages = [statistics.median(t[page] for _, t in runs) for page in PAGES]
+            print(f'{mode:9} {ready * 1000:9.1f}' + ''.join(f'{t * 1000:14.1f}' for t in pages))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
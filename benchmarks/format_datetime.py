@@ -0,0 +1,78 @@
+"""Time rendering pages/shows.html with 10k show tiles.
+
+Compares the old `datetime` filter (str() in the view, then a dateutil parse
+and a Babel pattern parse per tile) with the current one (datetime objects
+and precompiled patterns). No database access is needed.
+
+    $ python benchmarks/format_datetime.py --tiles 10000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates  # noqa: E402
+import dateutil.parser  # noqa: E402
+from flask import render_template  # noqa: E402
+
+from app import app, format_datetime  # noqa: E402
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def make_shows(count, stringify):
+    start = datetime(2030, 1, 1, 20, 0)
+    shows = []
+    for i in range(count):
+        start_time = start + timedelta(hours=7 * i)
+        shows.append({
+            "venue_id": i % 50,
+            "venue_name": f'Venue {i % 50}',
+            "artist_id": i % 300,
+            "artist_name": f'Artist {i % 300}',
+            "artist_image_link": 'https://example.com/artist.jpg',
+            "start_time": str(start_time) if stringify else start_time,
+        })
+    return shows
+
+
+def time_render(shows, repeat):
+    samples = []
+    with app.test_request_context('/shows'):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render_template('pages/shows.html', shows=shows, page=None)
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--tiles', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app.jinja_env.filters['datetime'] = legacy_format_datetime
+    legacy = time_render(make_shows(args.tiles, stringify=True), args.repeat)
+
+    app.jinja_env.filters['datetime'] = format_datetime
+    current = time_render(make_shows(args.tiles, stringify=False), args.repeat)
+
+    print(f'{args.tiles} tiles, median of {args.repeat} renders')
+    print(f'  legacy filter : {legacy * 1000:9.1f} ms')
+    print(f'  current filter: {current * 1000:9.1f} ms  ({legacy / current:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""Replay a recorded request log against a locally started app.
+
+Record real traffic by running the app with REQUEST_LOG_FILE set (one JSON
+line per request: method, path, form body, timing; see request_log.py):
+
+    $ REQUEST_LOG_FILE=/var/tmp/fyyur-requests.jsonl gunicorn wsgi:app
+
+then replay it with --concurrency clients against a fresh server, optionally
+on a freshly seeded database (benchmarks/seed.py), and get throughput,
+latency percentiles and error rates per route:
+
+    $ python benchmarks/replay.py /var/tmp/fyyur-requests.jsonl \\
+        --database-url postgresql://.../fyyur_bench --seed 100k --concurrency 32
+
+--speed 0 (the default) sends requests back to back; --speed 1 keeps the
+recorded pacing, 2 replays it twice as fast. Recorded ids must exist in the
+target database: replay on a copy of the recorded one, or on a seeded one
+(ids start at 1). Requests for missing rows show up as 4xx, not errors.
+Form posts are replayed with CSRF checks off (WTF_CSRF_ENABLED=0), since the
+recorded tokens belong to other sessions. --url targets a server that is
+already running instead of starting one.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from sqlalchemy import create_engine
+
+from serving_modes import ROOT, SERVERS, wait_until_up
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect is the response being measured; following it would time a
+    # second request
+    def redirect_request(self, *args):
+        return None
+
+
+def load_log(path):
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if 'method' in entry and 'path' in entry:
+                    entries.append(entry)
+    return entries
+
+
+def route_of(entry):
+    # Group by the recorded endpoint, or by the path with ids masked for logs
+    # that have none
+    route = entry.get('endpoint') or re.sub(r'/\d+(?=/|$)', '/<id>', entry['path'].split('?')[0])
+    return f"{entry['method']} {route}"
+
+
+def send(opener, base, entry):
+    # Returns the status code, or None if no response arrived
+    data = None
+    if entry['method'] != 'GET':
+        data = urllib.parse.urlencode(entry.get('form') or {}, doseq=True).encode()
+    req = urllib.request.Request(base + entry['path'], data=data, method=entry['method'])
+    try:
+        with opener.open(req, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        error.read()
+        return error.code
+    except OSError:  # URLError, timeouts, resets
+        return None
+
+
+def replay(base, entries, concurrency, speed, loops):
+    # Returns (elapsed seconds, [(route, seconds, status), ...])
+    first = entries[0].get('ts', 0)
+    offsets = [entry.get('ts', first) - first for entry in entries]
+    span = offsets[-1] + 1
+    total = len(entries) * loops
+    results = []
+    lock = threading.Lock()
+    position = [0]
+    started = time.monotonic()
+
+    def client():
+        opener = urllib.request.build_opener(NoRedirect)
+        mine = []
+        while True:
+            with lock:
+                i = position[0]
+                position[0] += 1
+            if i >= total:
+                break
+            loop, index = divmod(i, len(entries))
+            if speed:
+                delay = started + (loop * span + offsets[index]) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            entry = entries[index]
+            sent = time.perf_counter()
+            status = send(opener, base, entry)
+            mine.append((route_of(entry), time.perf_counter() - sent, status))
+        with lock:
+            results.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.monotonic() - started, results
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(elapsed, results):
+    by_route = defaultdict(list)
+    for route, seconds, status in results:
+        by_route[route].append((seconds, status))
+    by_route['TOTAL'] = [(seconds, status) for _, seconds, status in results]
+
+    print(f'{len(results)} requests in {elapsed:.1f}s, {len(results) / elapsed:.1f} req/s')
+    print(f'{"route":40} {"count":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"4xx":>6} {"errors":>7}')
+    for route in sorted(by_route, key=lambda r: (r == 'TOTAL', r)):
+        rows = by_route[route]
+        latencies = sorted(seconds for seconds, _ in rows)
+        client_errors = sum(1 for _, status in rows if status is not None and 400 <= status < 500)
+        # 5xx and requests that got no response at all
+        errors = sum(1 for _, status in rows if status is None or status >= 500)
+        print('%-40s %7d %8.1f %8.1f %8.1f %8.1f %6d %6.1f%%' % (
+            route[:40], len(rows), len(rows) / elapsed,
+            percentile(latencies, 0.5) * 1000, percentile(latencies, 0.95) * 1000,
+            percentile(latencies, 0.99) * 1000, client_errors, 100.0 * errors / len(rows)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', help='JSON-lines request log (REQUEST_LOG_FILE)')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--seed', metavar='SCALE', help='seed the database first: 1k, 100k or 1m')
+    parser.add_argument('--url', help='replay against this running server instead of starting one')
+    parser.add_argument('--server', choices=sorted(SERVERS), default='gthread')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='gthread threads per worker')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='0: back to back; 1: recorded pacing; 2: twice as fast')
+    parser.add_argument('--loops', type=int, default=1, help='replay the log this many times')
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    entries = load_log(args.log)
+    if not entries:
+        raise SystemExit(f'{args.log} has no requests')
+
+    if args.url:
+        elapsed, results = replay(args.url.rstrip('/'), entries, args.concurrency, args.speed, args.loops)
+        report(elapsed, results)
+        return 0
+
+    if not args.database_url:
+        parser.error('--database-url (or DATABASE_URL) is required')
+    if args.seed:
+        from seed import SCALES, seed
+        engine = create_engine(args.database_url)
+        seed(engine, *SCALES[args.seed])
+        engine.dispose()
+
+    env = dict(os.environ, DATABASE_URL=args.database_url, WTF_CSRF_ENABLED='0')
+    env.pop('REQUEST_LOG_FILE', None)  # don't record the replay
+    process = subprocess.Popen(SERVERS[args.server](args.port, args), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_up(base, process)
+        elapsed, results = replay(base, entries, args.concurrency, args.speed, args.loops)
+    finally:
+        process.terminate()
+        process.wait()
+    print(f'{args.server}, {args.workers} workers, {args.concurrency} clients, '
+          f'{len(entries)} logged requests x {args.loops}')
+    report(elapsed, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""Time every route of the app through the Flask test client.
+
+Seeds a database at the given scale (unless --no-seed), then requests each
+route --repeat times and prints p50/p95 latency and the SQL statements per
+request. Compared with a saved baseline, a route regresses when it runs more
+queries than before or its p95 grows beyond --tolerance. A form post that
+flashes an error or writes nothing fails the run. The exit status is 1 if any
+route regressed or failed, so this can gate a change:
+
+    $ python benchmarks/routes.py --database-url postgresql://.../fyyur_bench --scale 100k --save-baseline
+    $ git checkout my-branch
+    $ python benchmarks/routes.py --database-url postgresql://.../fyyur_bench --no-seed
+
+The response cache is off so every request reaches the database. Write routes (create/edit) do write; use a scratch database.
+Latencies depend on the machine, so baselines are kept locally
+(benchmarks/baseline.json by default) rather than committed.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Routes that are not timed: static files, deletes (they would empty the
+# data set) and the profiler's /metrics when PROFILING is on
+SKIPPED = {'static', 'delete_venue', 'delete_artist', 'metrics'}
+
+# Routes that stream whole tables; they run fewer times
+STREAMING = {'api.list_venues', 'api.list_artists', 'api.list_shows'}
+
+# The form handlers report a failed write with a flashed message (and a 200)
+FAILED_FLASH = re.compile(r'error|could not|went wrong', re.I)
+
+
+def entity_form(genre, **fields):
+    return dict({
+        'city': 'Austin', 'state': 'TX', 'phone': '5550000000', 'genres': [genre],
+        'image_link': 'https://example.com/bench.jpg', 'facebook_link': 'https://facebook.com/bench',
+        'website_link': 'https://example.com', 'seeking_talent': 'y', 'seeking_venue': 'y',
+        'seeking_description': 'Benchmark run',
+    }, **fields)
+
+
+def routes(venue, artist, genre, genre_name):
+    # (endpoint, method, path, form data)
+    upcoming = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('search_venues', 'POST', '/venues/search', {'search_term': 'venue 1'}),
+        ('show_venue', 'GET', f'/venues/{venue}', None),
+        ('browse_venues', 'GET', f'/venues/browse?genre={genre}&state=NY', None),
+        ('create_venue_form', 'GET', '/venues/create', None),
+        ('create_venue_submission', 'POST', '/venues/create',
+         entity_form(genre_name, name='Bench Venue', address='1 Bench Street')),
+        ('edit_venue', 'GET', f'/venues/{venue}/edit', None),
+        ('edit_venue_submission', 'POST', f'/venues/{venue}/edit',
+         entity_form(genre_name, name=f'Venue {venue}', address=f'{venue} Main Street')),
+        ('artists', 'GET', '/artists', None),
+        ('search_artists', 'POST', '/artists/search', {'search_term': 'artist 1'}),
+        ('show_artist', 'GET', f'/artists/{artist}', None),
+        ('browse_artists', 'GET', f'/artists/browse?genre={genre}&state=NY', None),
+        ('create_artist_form', 'GET', '/artists/create', None),
+        ('create_artist_submission', 'POST', '/artists/create', entity_form(genre_name, name='Bench Artist')),
+        ('edit_artist', 'GET', f'/artists/{artist}/edit', None),
+        ('edit_artist_submission', 'POST', f'/artists/{artist}/edit',
+         entity_form(genre_name, name=f'Artist {artist}')),
+        ('shows', 'GET', '/shows', None),
+        ('create_shows', 'GET', '/shows/create', None),
+        ('create_show_submission', 'POST', '/shows/create',
+         {'venue_id': venue, 'artist_id': artist, 'start_time': upcoming}),
+        ('genres', 'GET', '/genres', None),
+        ('genre_venues', 'GET', f'/genres/{genre}/venues', None),
+        ('genre_artists', 'GET', f'/genres/{genre}/artists', None),
+        ('cache_stats', 'GET', '/cache/stats', None),
+        ('db_stats', 'GET', '/db/stats', None),
+        ('api.list_venues', 'GET', '/api/v1/venues', None),
+        ('api.browse_venues', 'GET', f'/api/v1/venues/browse?genre={genre}', None),
+        ('api.search_venues', 'GET', '/api/v1/venues/search?q=venue+1', None),
+        ('api.get_venue', 'GET', f'/api/v1/venues/{venue}', None),
+        ('api.list_artists', 'GET', '/api/v1/artists', None),
+        ('api.browse_artists', 'GET', f'/api/v1/artists/browse?genre={genre}', None),
+        ('api.search_artists', 'GET', '/api/v1/artists/search?q=artist+1', None),
+        ('api.get_artist', 'GET', f'/api/v1/artists/{artist}', None),
+        ('api.list_shows', 'GET', '/api/v1/shows', None),
+        ('api.get_show', 'GET', '/api/v1/shows/1', None),
+    ]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def sample_ids(db, Venue, Artist, Genre, venue_genre_table):
+    # The busiest venue/artist and the most common genre: the worst case
+    # detail pages rather than an empty one
+    venue = db.session.query(Venue.id).order_by(
+        (Venue.upcoming_show_count + Venue.past_show_count).desc(), Venue.id).limit(1).scalar()
+    artist = db.session.query(Artist.id).order_by(
+        (Artist.upcoming_show_count + Artist.past_show_count).desc(), Artist.id).limit(1).scalar()
+    genre = db.session.query(Genre.id, Genre.name).join(
+        venue_genre_table, venue_genre_table.c.genres_id == Genre.id).group_by(
+        Genre.id, Genre.name).order_by(db.func.count().desc(), Genre.id).first()
+    db.session.remove()
+    if venue is None or artist is None or genre is None:
+        raise SystemExit('no venues, artists or genres; seed the database first')
+    return venue, artist, genre[0], genre[1]
+
+
+def measure(app, client, counter, method, path, data, repeat, writes=False):
+    # counter: [statements, writing statements] of the current request. A
+    # request fails when it flashes an error, or when it should write
+    # (`writes`) and did not: either way it was not timing the real work.
+    from flask import message_flashed
+    latencies, queries, statuses = [], [], set()
+    flashed, failed = [], 0
+
+    def on_flash(sender, message, category, **extra):
+        flashed.append(message)
+
+    with message_flashed.connected_to(on_flash, app):
+        for i in range(repeat + 1):
+            counter[:] = [0, 0]
+            del flashed[:]
+            started = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            statuses.add(response.status_code)
+            if any(FAILED_FLASH.search(message) for message in flashed) or (writes and not counter[1]):
+                failed += 1
+            if i:  # the first request warms templates and caches
+                latencies.append(elapsed)
+                queries.append(counter[0])
+    return {
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'queries': percentile(queries, 0.5),
+        'status': sorted(statuses),
+        'failed': failed,
+    }
+
+
+def compare(results, baseline, tolerance, slack_ms=1.0):
+    # Returns (endpoint, reason) for every regressed route
+    regressions = []
+    for endpoint, now in results.items():
+        before = baseline.get(endpoint)
+        if before is None:
+            continue
+        if now['queries'] > before['queries']:
+            regressions.append((endpoint, f"queries {before['queries']} -> {now['queries']}"))
+        if now['p95_ms'] > before['p95_ms'] * (1 + tolerance) + slack_ms:
+            regressions.append((endpoint, f"p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms"))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--scale', default='1k', help='seed scale: 1k, 100k or 1m')
+    parser.add_argument('--no-seed', action='store_true', help='use the data already in the database')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--only', nargs='+', metavar='ENDPOINT', help='time only these routes')
+    parser.add_argument('--baseline', default=os.path.join(ROOT, 'benchmarks', 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative p95 growth before a route counts as regressed')
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url (or DATABASE_URL) is required')
+
+    # config.py reads the environment at import time
+    os.environ.update(DATABASE_URL=args.database_url, CACHE_TYPE='null', CACHE_STATS='1',
+                      DB_STATS='1')
+    from sqlalchemy import event
+    from app import app, db
+    from models import Venue, Artist, Genre, venue_genre_table
+    import seed
+
+    app.config.update(WTF_CSRF_ENABLED=False, TESTING=True)
+    with app.app_context():
+        if not args.no_seed:
+            seed.seed(db.engine, *seed.SCALES[args.scale])
+        venue, artist, genre, genre_name = sample_ids(db, Venue, Artist, Genre, venue_genre_table)
+        dialect = db.engine.dialect.name
+        counter = [0, 0]
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(conn, cursor, statement, *args):
+            counter[0] += 1
+            if not statement.lstrip().upper().startswith('SELECT'):
+                counter[1] += 1
+
+    table = routes(venue, artist, genre, genre_name)
+    covered = {endpoint for endpoint, _, _, _ in table}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint not in covered | SKIPPED:
+            print(f'warning: {rule.endpoint} ({rule.rule}) is not benchmarked', file=sys.stderr)
+
+    client = app.test_client()
+    results = {}
+    print(f'{"endpoint":28} {"method":6} {"p50 ms":>8} {"p95 ms":>8} {"queries":>7}  status')
+    for endpoint, method, path, data in table:
+        if args.only and endpoint not in args.only:
+            continue
+        repeat = min(3, args.repeat) if endpoint in STREAMING else args.repeat
+        result = results[endpoint] = measure(app, client, counter, method, path, data, repeat,
+                                             writes=endpoint.endswith('_submission'))
+        print('%-28s %-6s %8.1f %8.1f %7d  %s%s' % (
+            endpoint, method, result['p50_ms'], result['p95_ms'], result['queries'],
+            ','.join(map(str, result['status'])),
+            '  FAILED %d/%d' % (result['failed'], repeat + 1) if result['failed'] else ''))
+    failures = [endpoint for endpoint, result in results.items() if result['failed']]
+    if failures:
+        # Neither a baseline nor a comparison means anything with these
+        print(f"\nFAILED {', '.join(failures)}: a write failed or was not made")
+        return 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'scale': None if args.no_seed else args.scale,
+                'dialect': dialect,
+                'python': platform.python_version(),
+                'routes': results,
+            }, f, indent=2, sort_keys=True)
+        print(f'baseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['routes'], args.tolerance)
+    print(f"\ncompared with {args.baseline} ({baseline['created']}, {baseline['dialect']})")
+    for endpoint, reason in regressions:
+        print(f'REGRESSION {endpoint}: {reason}')
+    if not regressions:
+        print('no regressions')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
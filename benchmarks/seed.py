@@ -0,0 +1,147 @@
+"""Seed a database with synthetic venues, artists, genres and shows.
+
+Cities, genres and show bookings follow skewed (Zipf-like) distributions so a
+few big cities, popular genres and busy venues/artists dominate, as in real
+listings. The same --random-seed always produces the same data.
+
+    $ python benchmarks/seed.py --database-url postgresql://.../fyyur_bench --scale 100k
+
+Scales: 1k, 100k and 1m shows (see SCALES). Tables are created if missing;
+rows are appended after the highest existing ids. The facet and show-count
+read models are rebuilt afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select, text  # noqa: E402
+
+import facets  # noqa: E402
+import show_counts  # noqa: E402
+from forms import VenueForm  # noqa: E402
+from models import db, Venue, Artist, Show, Genre, venue_genre_table, artist_genre_table  # noqa: E402
+
+
+# scale: (venues, artists, shows)
+SCALES = {
+    '1k': (100, 200, 1000),
+    '100k': (2000, 10000, 100000),
+    '1m': (10000, 50000, 1000000),
+}
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+    ('Nashville', 'TN'), ('Austin', 'TX'), ('San Francisco', 'CA'), ('Seattle', 'WA'),
+    ('New Orleans', 'LA'), ('Atlanta', 'GA'), ('Boston', 'MA'), ('Denver', 'CO'),
+    ('Philadelphia', 'PA'), ('Portland', 'OR'), ('Miami', 'FL'), ('Detroit', 'MI'),
+    ('Minneapolis', 'MN'), ('San Diego', 'CA'), ('Phoenix', 'AZ'), ('Memphis', 'TN'),
+]
+
+GENRES = [value for value, _ in VenueForm.genres.kwargs['choices']]
+
+CHUNK = 10000
+
+
+def zipf_weights(n, s=1.0):
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def pick_genres(rng, weights):
+    # 1-3 distinct genres, popular ones more often
+    count = rng.choices((1, 2, 3), weights=(5, 3, 2))[0]
+    return set(rng.choices(GENRES, cum_weights=weights, k=count))
+
+
+def next_id(conn, table):
+    return conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+
+
+def seed(engine, venues, artists, shows, random_seed=42, echo=print):
+    rng = random.Random(random_seed)
+    db.metadata.create_all(engine)
+    city_weights = zipf_weights(len(CITIES))
+    genre_weights = zipf_weights(len(GENRES), 0.8)
+    now = datetime.now()
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        known = dict(conn.execute(select(Genre.name, Genre.id)).all())
+        missing = [name for name in GENRES if name not in known]
+        if missing:
+            conn.execute(insert(Genre.__table__), [{'name': name} for name in missing])
+            known = dict(conn.execute(select(Genre.name, Genre.id)).all())
+
+        ids = {}
+        for model, count, owner, seeking in (
+                (Venue, venues, venue_genre_table.c.venues_id, 'seeking_talent'),
+                (Artist, artists, artist_genre_table.c.artists_id, 'seeking_venue')):
+            table = model.__table__
+            first = next_id(conn, table) + 1
+            ids[model] = range(first, first + count)
+            label = model.__name__
+            for start in range(0, count, CHUNK):
+                rows, pairs = [], []
+                for i in ids[model][start:start + CHUNK]:
+                    city, state = rng.choices(CITIES, cum_weights=city_weights)[0]
+                    row = {'id': i, 'name': f'{label} {i}', 'city': city, 'state': state,
+                           'phone': '555%07d' % i, 'image_link': f'https://example.com/{label.lower()}/{i}.jpg',
+                           seeking: rng.random() < 0.3}
+                    if model is Venue:
+                        row['address'] = f'{i} Main Street'
+                    rows.append(row)
+                    pairs.extend({'genres_id': known[name], owner.name: i}
+                                 for name in pick_genres(rng, genre_weights))
+                conn.execute(insert(table), rows)
+                conn.execute(insert(owner.table), pairs)
+            echo(f'{count} {table.name}')
+
+        # Busy venues and artists get most of the bookings; two thirds of the
+        # shows are in the past two years, the rest in the coming year
+        venue_weights = zipf_weights(venues, 0.7)
+        artist_weights = zipf_weights(artists, 0.7)
+        venue_ids = list(ids[Venue])
+        artist_ids = list(ids[Artist])
+        for start in range(0, shows, CHUNK):
+            size = min(CHUNK, shows - start)
+            conn.execute(insert(Show.__table__), [{
+                'venue_id': venue_id,
+                'artist_id': artist_id,
+                'start_time': now + timedelta(minutes=rng.randint(-60 * 24 * 730, 60 * 24 * 365)),
+            } for venue_id, artist_id in zip(
+                rng.choices(venue_ids, cum_weights=venue_weights, k=size),
+                rng.choices(artist_ids, cum_weights=artist_weights, k=size))])
+        echo(f'{shows} shows')
+
+        if engine.dialect.name == 'postgresql':
+            for table in ('venues', 'artists', 'shows', 'genres'):
+                conn.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('%s', 'id'), "
+                    "coalesce(max(id), 0) + 1, false) FROM %s" % (table, table)))
+
+        facets.rebuild(conn)
+        for model in (Venue, Artist):
+            show_counts.refresh(conn, model, list(ids[model]), now)
+
+    echo(f'Seeded in {time.perf_counter() - started:.1f}s')
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--random-seed', type=int, default=42)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url (or DATABASE_URL) is required')
+    seed(create_engine(args.database_url), *SCALES[args.scale], random_seed=args.random_seed)
+
+
+if __name__ == '__main__':
+    main()
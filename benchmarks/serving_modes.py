@@ -0,0 +1,155 @@
+"""Load-test the venue/artist pages under each serving mode.
+
+Starts the app once per (server, CONCURRENT_DETAIL_QUERIES) combination with
+the same number of worker processes, drives it with --clients concurrent
+keep-alive-less HTTP clients requesting random /venues/<id> and
+/artists/<id> pages for --duration seconds, and prints throughput and
+latency percentiles for each run:
+
+    sync     gunicorn, sync workers (one request per process at a time)
+    gthread  gunicorn, --threads threads per worker
+    asgi     uvicorn running asgi:application
+
+    $ python benchmarks/serving_modes.py --database-url postgresql://.../fyyur_bench --workers 4
+
+Seed the database first (--seed 100k, or benchmarks/seed.py). The response
+cache is disabled so every request reaches the database.
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from sqlalchemy import create_engine, text
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'sync': lambda port, args: [
+        'gunicorn', '--workers', str(args.workers), '--worker-class', 'sync',
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'wsgi:app'],
+    'gthread': lambda port, args: [
+        'gunicorn', '--workers', str(args.workers), '--worker-class', 'gthread',
+        '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}',
+        '--log-level', 'warning', 'wsgi:app'],
+    'asgi': lambda port, args: [
+        'uvicorn', '--workers', str(args.workers), '--host', '127.0.0.1',
+        '--port', str(port), '--log-level', 'warning', 'asgi:application'],
+}
+
+
+def sample_paths(database_url, count=500):
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        venues = [r[0] for r in conn.execute(text('SELECT id FROM venues LIMIT :n'), {'n': count})]
+        artists = [r[0] for r in conn.execute(text('SELECT id FROM artists LIMIT :n'), {'n': count})]
+    engine.dispose()
+    return [f'/venues/{i}' for i in venues] + [f'/artists/{i}' for i in artists]
+
+
+def wait_until_up(base, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'server exited with {process.returncode}')
+        try:
+            urllib.request.urlopen(base + '/', timeout=5).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit('server did not start')
+
+
+def drive(base, paths, clients, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client():
+        rng = random.Random()
+        mine = []
+        failed = 0
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                urllib.request.urlopen(base + rng.choice(paths), timeout=30).read()
+                mine.append(time.perf_counter() - started)
+            except OSError:  # URLError, timeouts, resets
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run(mode, concurrent, args, paths, port):
+    env = dict(os.environ,
+               DATABASE_URL=args.database_url,
+               CACHE_TYPE='null',
+               CONCURRENT_DETAIL_QUERIES='1' if concurrent else '0',
+               DB_POOL_SIZE=str(args.pool_size))
+    process = subprocess.Popen(SERVERS[mode](port, args), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        wait_until_up(base, process)
+        drive(base, paths, args.clients, min(2, args.duration))  # warm up
+        latencies, errors = drive(base, paths, args.clients, args.duration)
+    finally:
+        process.terminate()
+        process.wait()
+    latencies.sort()
+    if not latencies:
+        return mode, concurrent, 0, 0, 0, errors
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    return (mode, concurrent, len(latencies) / args.duration,
+            statistics.median(latencies) * 1000, p95 * 1000, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--seed', metavar='SCALE', help='seed the database first: 1k, 100k or 1m')
+    parser.add_argument('--modes', nargs='+', choices=sorted(SERVERS), default=sorted(SERVERS))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='gthread threads per worker')
+    parser.add_argument('--pool-size', type=int, default=10, help='DB_POOL_SIZE per worker')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url (or DATABASE_URL) is required')
+    if args.seed:
+        from seed import SCALES, seed
+        engine = create_engine(args.database_url)
+        seed(engine, *SCALES[args.seed])
+        engine.dispose()
+
+    paths = sample_paths(args.database_url)
+    if not paths:
+        raise SystemExit('no venues or artists; seed the database first')
+
+    print(f'{args.workers} workers, {args.clients} clients, {args.duration:.0f}s per run')
+    print(f'{"mode":8} {"concurrent":>10} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+    for mode in args.modes:
+        for concurrent in (False, True):
+            row = run(mode, concurrent, args, paths, args.port)
+            print('%-8s %10s %8.1f %8.1f %8.1f %7d' % row)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
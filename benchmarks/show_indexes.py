@@ -0,0 +1,121 @@
+"""Compare the show hot-path queries with and without the shows indexes.
+
+Optionally seeds a *scratch* Postgres database with benchmarks/seed.py, then
+runs each query app.py issues against the shows table twice: once with the
+indexes from migration 5b2c9f1e7a34 dropped and once with them in place. For
+each run it prints the EXPLAIN (ANALYZE, BUFFERS) plan and the median latency.
+
+    $ python benchmarks/show_indexes.py --database-url postgresql://.../fyyur_bench --seed 1m
+
+The indexes are dropped and recreated while it runs, so never point it at a
+database that is serving traffic.
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from seed import SCALES, seed
+
+
+INDEXES = {
+    'ix_shows_venue_id_start_time': '(venue_id, start_time)',
+    'ix_shows_artist_id_start_time': '(artist_id, start_time)',
+    'ix_shows_start_time_id': '(start_time, id)',
+}
+
+# The statements behind show_venue, show_artist, venues and shows
+QUERIES = {
+    'venue shows': (
+        "SELECT shows.start_time, artists.id, artists.name, artists.image_link "
+        "FROM shows JOIN artists ON artists.id = shows.artist_id "
+        "WHERE shows.venue_id = :venue_id"
+    ),
+    'artist shows': (
+        "SELECT shows.start_time, venues.id, venues.name, venues.image_link "
+        "FROM shows JOIN venues ON venues.id = shows.venue_id "
+        "WHERE shows.artist_id = :artist_id"
+    ),
+    'venue upcoming count': (
+        "SELECT count(*) FROM shows "
+        "WHERE shows.venue_id = :venue_id AND shows.start_time > :now"
+    ),
+    'shows page': (
+        "SELECT shows.id, shows.start_time FROM shows "
+        "WHERE (shows.start_time, shows.id) > (:start_time, 0) "
+        "ORDER BY shows.start_time, shows.id LIMIT 21"
+    ),
+}
+
+def sample_params(conn):
+    venue_id = conn.execute(text(
+        "SELECT venue_id FROM shows GROUP BY venue_id ORDER BY count(*) DESC LIMIT 1")).scalar()
+    artist_id = conn.execute(text(
+        "SELECT artist_id FROM shows GROUP BY artist_id ORDER BY count(*) DESC LIMIT 1")).scalar()
+    median_start = conn.execute(text(
+        "SELECT percentile_disc(0.5) WITHIN GROUP (ORDER BY start_time) FROM shows")).scalar()
+    return {'venue_id': venue_id, 'artist_id': artist_id,
+            'now': datetime.now(), 'start_time': median_start}
+
+
+def run_queries(conn, params, repeat, explain):
+    timings = {}
+    for name, sql in QUERIES.items():
+        if explain:
+            plan = conn.execute(text('EXPLAIN (ANALYZE, BUFFERS) ' + sql), params)
+            print(f'--- {name}')
+            for line in plan:
+                print('    ' + line[0])
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def set_indexes(conn, present):
+    for name, columns in INDEXES.items():
+        if present:
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON shows {columns}'))
+        else:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    conn.execute(text('ANALYZE shows'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    # Deliberately no default (not even DATABASE_URL): the app's own database
+    # must never be the one whose indexes get dropped
+    parser.add_argument('--database-url', required=True,
+                        help='a scratch database; its shows indexes are dropped and recreated')
+    parser.add_argument('--seed', metavar='SCALE', choices=sorted(SCALES),
+                        help='insert a synthetic dataset before measuring: 1k, 100k or 1m')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--no-explain', dest='explain', action='store_false')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.seed:
+        seed(engine, *SCALES[args.seed])
+
+    results = {}
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        params = sample_params(conn)
+        for label, present in (('before', False), ('after', True)):
+            print(f'=== {label}: indexes {"present" if present else "dropped"}')
+            set_indexes(conn, present)
+            results[label] = run_queries(conn, params, args.repeat, args.explain)
+
+    print(f'\n{"query":<24}{"before ms":>12}{"after ms":>12}{"speedup":>10}')
+    for name in QUERIES:
+        before, after = results['before'][name], results['after'][name]
+        print(f'{name:<24}{before:>12.2f}{after:>12.2f}{before / max(after, 1e-6):>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
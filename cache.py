@@ -0,0 +1,178 @@
+import functools
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, session, g, make_response
+from flask.signals import message_flashed
+
+
+# Response cache for the read-only pages.
+# Cached responses are keyed on the request path + query string and on the
+# current version of every tag the view declares ('venues', 'venue:3', ...).
+# Invalidating a tag just bumps its version, so stale entries are never served
+# again and simply age out of the backend.
+# The in-process LRU ('simple') keeps its tag versions per process: a write
+# invalidates only the worker that handled it, and the other gunicorn workers
+# (or a `flask import` run) cannot reach theirs, so those serve stale pages
+# for up to CACHE_DEFAULT_TIMEOUT seconds. Only Redis makes invalidation
+# precise across processes; gunicorn.conf.py warns about 'simple' with more
+# than one worker.
+
+
+class NullBackend(object):
+    # Nothing is cached, so nothing can be stale anywhere
+    shared = True
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def get_versions(self, tags):
+        return [0] * len(tags)
+
+    def bump_versions(self, tags):
+        pass
+
+
+class LRUBackend(object):
+    """In-process LRU with a per-entry TTL. Tag versions are kept apart from
+    the entries so that evicting an entry can never reset a version."""
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_versions(self, tags):
+        with self.lock:
+            return [self.versions.get(tag, 0) for tag in tags]
+
+    def bump_versions(self, tags):
+        with self.lock:
+            for tag in tags:
+                self.versions[tag] = self.versions.get(tag, 0) + 1
+
+
+class RedisBackend(object):
+    """Any client speaking the redis-py API (redis, fakeredis, KeyDB ...)."""
+    shared = True
+
+    def __init__(self, client, prefix='fyyur:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, timeout):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=timeout)
+
+    def get_versions(self, tags):
+        values = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(value or 0) for value in values]
+
+    def bump_versions(self, tags):
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.incr(self.prefix + 'tag:' + tag)
+        pipe.execute()
+
+
+class ResponseCache(object):
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.timeout = 300
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+        self.stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'simple')
+        self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        if cache_type == 'simple':
+            self.backend = LRUBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        elif cache_type == 'redis':
+            import redis
+            self.backend = RedisBackend(
+                redis.Redis.from_url(app.config['CACHE_REDIS_URL']))
+        else:
+            self.backend = NullBackend()
+        message_flashed.connect(self._mark_flashed, app)
+        app.extensions['response_cache'] = self
+
+    def _mark_flashed(self, sender, **extra):
+        g.response_cache_skip = True
+
+    def _count(self, name, amount=1):
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def counters(self):
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def cached(self, *tags):
+        """Cache the GET response of a view under `tags`, which are formatted
+        with the view's URL arguments, e.g. ``cached('venue:{venue_id}')``."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**kwargs):
+                # Pending flash messages are rendered into the page, so such
+                # responses are neither served from nor written to the cache
+                if request.method != 'GET' or '_flashes' in session:
+                    return view(**kwargs)
+
+                view_tags = [tag.format(**kwargs) for tag in tags]
+                versions = self.backend.get_versions(view_tags)
+                key = 'view:%s|%s' % (request.full_path, ','.join(
+                    '%s=%d' % pair for pair in zip(view_tags, versions)))
+
+                cached = self.backend.get(key)
+                if cached is not None:
+                    self._count('hits')
+                    body, status, mimetype = cached
+                    return make_response(body, status, {'Content-Type': mimetype})
+
+                self._count('misses')
+                g.response_cache_skip = False
+                response = make_response(view(**kwargs))
+                if response.status_code == 200 and not g.response_cache_skip:
+                    self.backend.set(key, (response.get_data(), response.status_code,
+                                           response.content_type), self.timeout)
+                    self._count('stores')
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if tags:
+            self.backend.bump_versions(tags)
+            self._count('invalidations', len(tags))
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+# QueuePool that records how long requests wait for a connection, so the
+# pool can be sized against the number of workers and Postgres' limit.
+
+class TimedQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super(TimedQueuePool, self).__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        except Exception:
+            with self.stats_lock:
+                self.failed_checkouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self.stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'status': pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool.stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'failed_checkouts': pool.failed_checkouts,
+                'wait_seconds_total': round(pool.total_wait, 6),
+                'wait_seconds_max': round(pool.max_wait, 6),
+                'wait_seconds_avg': round(pool.total_wait / pool.checkouts, 6)
+                if pool.checkouts else 0.0,
+            })
+    return stats
@@ -0,0 +1,215 @@
+import csv
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import String, func, select, text, type_coerce
+
+from models import db, Venue, Artist, Show, Genre, venue_genre_table, artist_genre_table
+
+
+# `flask export` -- nightly snapshots of venues, artists and shows.
+# Each table is read through a server-side cursor (stream_results) in chunks,
+# so memory is bounded by --chunk-size rather than by the table. --since only
+# exports rows whose updated_at is at or after the given time; the manifest
+# written next to the files records the value to pass on the next run.
+
+EXPORTS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show,
+}
+
+# Genre names are added to each chunk from the association tables, through
+# the column that links to the venue/artist
+GENRE_LINKS = {
+    Venue: venue_genre_table.c.venues_id,
+    Artist: artist_genre_table.c.artists_id,
+}
+
+EXTENSIONS = {'ndjson': 'ndjson', 'csv': 'csv', 'parquet': 'parquet'}
+
+
+def plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class NdjsonWriter(object):
+
+    def __init__(self, path, columns, compress):
+        self.file = gzip.open(path, 'wt', encoding='utf-8') if compress \
+            else open(path, 'w', encoding='utf-8')
+        self.columns = columns
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(dict(zip(self.columns, row)), default=plain) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(object):
+
+    def __init__(self, path, columns, compress):
+        self.file = gzip.open(path, 'wt', encoding='utf-8', newline='') if compress \
+            else open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        # Array cells use the same ';' separator `flask import` reads
+        self.writer.writerows(
+            [';'.join(value) if isinstance(value, list) else plain(value) for value in row]
+            for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+    """One Parquet row group per chunk. Needs the optional pyarrow package."""
+
+    def __init__(self, path, columns, compress):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise click.ClickException('--format parquet needs pyarrow (pip install pyarrow)')
+        self.pyarrow = pyarrow
+        self.columns = columns
+        self.path = path
+        self.compression = 'gzip' if compress else 'snappy'
+        self.writer = None
+
+    def write(self, rows):
+        table = self.pyarrow.table({
+            column: [row[i] for row in rows] for i, column in enumerate(self.columns)})
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(
+                self.path, table.schema, compression=self.compression)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {'ndjson': NdjsonWriter, 'csv': CsvWriter, 'parquet': ParquetWriter}
+
+
+def add_genres(conn, owner, rows):
+    # One query per chunk; rows come back with a trailing list of names
+    ids = [row[0] for row in rows]
+    names = {}
+    query = select(owner, Genre.name) \
+        .join(Genre, Genre.id == owner.table.c.genres_id) \
+        .where(owner.in_(ids)).order_by(Genre.name)
+    for owner_id, name in conn.execute(query):
+        names.setdefault(owner_id, []).append(name)
+    return [tuple(row) + (names.get(row[0], []),) for row in rows]
+
+
+def export_table(model, fmt, output_dir, compress, chunk_size, since=None, echo=print):
+    table = model.__table__
+    columns = [column.name for column in table.columns]
+    genre_owner = GENRE_LINKS.get(model)
+    if genre_owner is not None:
+        columns.append('genres')
+    query = select(table).order_by(table.c.id)
+    if since is not None:
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite compares the stored text: now() writes whole seconds and
+            # a bound datetime would add '.000000', which sorts after them
+            since = type_coerce(since.strftime('%Y-%m-%d %H:%M:%S'), String)
+        query = query.where(table.c.updated_at >= since)
+
+    path = os.path.join(output_dir, '%s.%s' % (table.name, EXTENSIONS[fmt]))
+    if compress and fmt != 'parquet':
+        path += '.gz'
+
+    started = time.perf_counter()
+    count = 0
+    writer = WRITERS[fmt](path, columns, compress)
+    try:
+        with db.engine.connect() as conn, db.engine.connect() as lookup:
+            result = conn.execution_options(
+                stream_results=True, yield_per=chunk_size).execute(query)
+            for chunk in result.partitions():
+                rows = [tuple(row) for row in chunk]
+                if genre_owner is not None:
+                    rows = add_genres(lookup, genre_owner, rows)
+                writer.write(rows)
+                count += len(chunk)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    echo(f'{table.name}: {count} rows -> {path} in {elapsed:.1f}s '
+         f'({count / max(elapsed, 1e-9):.0f} rows/s)')
+    return {'path': path, 'rows': count, 'seconds': round(elapsed, 3)}
+
+
+# Postgres stamps updated_at with now(), the time the writing transaction
+# began, not when it commits. A transaction still open when the export reads
+# its tables commits rows the export cannot see, stamped with that earlier
+# time; the watermark is therefore the start of the oldest transaction open
+# now (the query's own included), so the next --since run picks those rows up.
+# Transactions of other roles show xact_start only to members of
+# pg_read_all_stats; run the export as the application's role.
+OLDEST_TRANSACTION = text(
+    "SELECT min(xact_start)::timestamp FROM pg_stat_activity "
+    "WHERE datname = current_database() AND backend_type = 'client backend' "
+    "AND xact_start IS NOT NULL")
+
+
+def export_watermark():
+    # updated_at is filled in by the database, so compare against its clock
+    with db.engine.connect() as conn:
+        if db.engine.dialect.name == 'postgresql':
+            return conn.execute(OLDEST_TRANSACTION).scalar()
+        return conn.execute(select(func.now())).scalar()
+
+
+def export_all(kinds, fmt, output_dir, compress, chunk_size, since=None, echo=print):
+    os.makedirs(output_dir, exist_ok=True)
+    # Taken before any table is read: every row the export misses has
+    # updated_at >= started_at, so the next incremental run picks it up (rows
+    # the export did see may come again)
+    started_at = export_watermark()
+    manifest = {
+        'started_at': started_at.isoformat(),
+        'since': since.isoformat() if since else None,
+        'format': fmt,
+        'tables': {},
+    }
+    for kind in kinds:
+        manifest['tables'][kind] = export_table(
+            EXPORTS[kind], fmt, output_dir, compress, chunk_size, since, echo)
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    echo(f'Next incremental run: --since {started_at.isoformat()}')
+    return manifest
+
+
+@click.command('export')
+@click.argument('kinds', nargs=-1, type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(WRITERS)),
+              default='ndjson', show_default=True)
+@click.option('--output-dir', default='export', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the output files.')
+@click.option('--chunk-size', default=5000, show_default=True)
+@click.option('--since', type=click.DateTime(
+    formats=['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f']),
+    help='Only rows updated at or after this time.')
+@with_appcontext
+def export_command(kinds, fmt, output_dir, compress, chunk_size, since):
+    """Stream venues, artists and shows (all by default) to files."""
+    export_all(kinds or sorted(EXPORTS), fmt, output_dir, compress, chunk_size,
+               since, echo=click.echo)
@@ -0,0 +1,198 @@
+from collections import Counter, namedtuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, false, func, inspect, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, Venue, Artist, Genre, FacetCount, venue_genre_table, artist_genre_table
+
+
+# Faceted browsing of venues and artists by genre, city/state and seeking flag.
+# The counts come from the facet_counts summary table (models.FacetCount), one
+# row per (kind, genre, city, state, seeking) combination, so the counts for
+# any combination of filters are a GROUP BY over that small table instead of a
+# scan of venues/artists. Flush events keep it current: every flush that
+# writes venues or artists reads their combinations before and after, and adds
+# the difference in the same transaction.
+
+# owner: the genre association table's column that links to the entity
+Facet = namedtuple('Facet', ['kind', 'seeking', 'owner'])
+
+FACETED = {
+    Venue: Facet('venues', 'seeking_talent', venue_genre_table.c.venues_id),
+    Artist: Facet('artists', 'seeking_venue', artist_genre_table.c.artists_id),
+}
+
+# genre_id of the rows that count each entity once, whatever its genres
+ANY_GENRE = 0
+
+Filters = namedtuple('Filters', ['genre_id', 'city', 'state', 'seeking'])
+FacetCounts = namedtuple('FacetCounts', ['total', 'genres', 'cities', 'seeking'])
+
+UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def facet_keys(connection, model, ids):
+    # Counter of the summary rows the given venues/artists contribute to,
+    # as currently stored in the database
+    keys = Counter()
+    if not ids:
+        return keys
+    kind, seeking, owner = FACETED[model]
+    table = model.__table__
+    links = owner.table
+
+    entities = {}
+    for row in connection.execute(select(
+            table.c.id, table.c.city, table.c.state, table.c[seeking]).where(
+            table.c.id.in_(list(ids)))):
+        entities[row[0]] = (row[1] or '', row[2] or '', bool(row[3]))
+        keys[(kind, ANY_GENRE) + entities[row[0]]] += 1
+    if entities:
+        for owner_id, genre_id in connection.execute(select(
+                owner, links.c.genres_id).where(owner.in_(list(entities)))):
+            keys[(kind, genre_id) + entities[owner_id]] += 1
+    return keys
+
+
+def apply_changes(connection, old, new):
+    # Adds new - old to the summary counts with one upsert
+    delta = Counter(new)
+    delta.subtract(old)
+    table = FacetCount.__table__
+    columns = [column.name for column in table.primary_key.columns]
+    rows = [dict(zip(columns, key), count=n) for key, n in sorted(delta.items()) if n]
+    if not rows:
+        return
+    stmt = UPSERTS[connection.dialect.name](table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=columns, set_={'count': table.c.count + stmt.excluded['count']})
+    connection.execute(stmt, rows)
+
+
+def record_inserts(connection, model, ids):
+    # For bulk inserts that bypass the ORM (flask import)
+    apply_changes(connection, Counter(), facet_keys(connection, model, ids))
+
+
+@event.listens_for(Session, 'before_flush')
+def _read_old_facets(session, flush_context, instances):
+    session.info.pop('facets_pending', None)
+    changed = {}
+    for obj in list(session.dirty) + list(session.deleted):
+        if type(obj) in FACETED and inspect(obj).identity:
+            changed.setdefault(type(obj), set()).add(inspect(obj).identity[0])
+    new = [obj for obj in session.new if type(obj) in FACETED]
+    if not changed and not new:
+        return
+    connection = session.connection()
+    old = Counter()
+    for model, ids in changed.items():
+        old.update(facet_keys(connection, model, ids))
+    session.info['facets_pending'] = (changed, new, old)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_facet_changes(session, flush_context):
+    pending = session.info.pop('facets_pending', None)
+    if pending is None:
+        return
+    changed, new, old = pending
+    for obj in new:
+        changed.setdefault(type(obj), set()).add(obj.id)
+    connection = session.connection()
+    current = Counter()
+    for model, ids in changed.items():
+        current.update(facet_keys(connection, model, ids))
+    apply_changes(connection, old, current)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_facet_changes(session):
+    session.info.pop('facets_pending', None)
+
+
+def rebuild(connection):
+    # Recomputes the whole summary table from venues/artists
+    table = FacetCount.__table__
+    selects = []
+    for model, (kind, seeking, owner) in FACETED.items():
+        entity = model.__table__
+        links = owner.table
+        columns = (
+            func.coalesce(entity.c.city, ''),
+            func.coalesce(entity.c.state, ''),
+            func.coalesce(entity.c[seeking], false()),
+        )
+        selects.append(select(literal(kind), literal(ANY_GENRE), *columns, func.count())
+                       .group_by(*columns))
+        selects.append(select(literal(kind), links.c.genres_id, *columns, func.count())
+                       .join_from(entity, links, owner == entity.c.id)
+                       .group_by(links.c.genres_id, *columns))
+    connection.execute(delete(table))
+    connection.execute(table.insert().from_select(
+        ['kind', 'genre_id', 'city', 'state', 'seeking', 'count'], union_all(*selects)))
+
+
+def parse_filters(args):
+    seeking = {'1': True, '0': False}.get(args.get('seeking'))
+    return Filters(args.get('genre', type=int), args.get('city') or None,
+                   args.get('state') or None, seeking)
+
+
+def facet_counts(model, filters):
+    # Counts per genre, city/state and seeking flag; each facet is narrowed by
+    # the other facets' filters but not by its own, so choosing a value
+    # still shows the alternatives
+    kind = FACETED[model].kind
+
+    def counted(*columns, skip=None):
+        query = db.session.query(*columns, func.sum(FacetCount.count).label('total')).select_from(
+            FacetCount).filter(FacetCount.kind == kind, FacetCount.count > 0)
+        if skip != 'genre':
+            query = query.filter(FacetCount.genre_id == (filters.genre_id or ANY_GENRE))
+        if skip != 'city':
+            if filters.city is not None:
+                query = query.filter(FacetCount.city == filters.city)
+            if filters.state is not None:
+                query = query.filter(FacetCount.state == filters.state)
+        if skip != 'seeking' and filters.seeking is not None:
+            query = query.filter(FacetCount.seeking == filters.seeking)
+        return query
+
+    genres = counted(Genre.id, Genre.name, skip='genre').join(
+        Genre, Genre.id == FacetCount.genre_id).group_by(
+        Genre.id, Genre.name).order_by(Genre.name).all()
+    cities = counted(FacetCount.city, FacetCount.state, skip='city').group_by(
+        FacetCount.city, FacetCount.state).order_by(FacetCount.state, FacetCount.city).all()
+    seeking = counted(FacetCount.seeking, skip='seeking').group_by(
+        FacetCount.seeking).order_by(FacetCount.seeking.desc()).all()
+    total = counted().scalar() or 0
+    return FacetCounts(total, genres, cities, seeking)
+
+
+def browse_query(model, filters):
+    # id/name/city/state of the venues or artists matching every filter
+    kind, seeking, owner = FACETED[model]
+    query = db.session.query(model.id, model.name, model.city, model.state)
+    if filters.genre_id is not None:
+        query = query.join(owner.table, owner == model.id).filter(
+            owner.table.c.genres_id == filters.genre_id)
+    if filters.city is not None:
+        query = query.filter(model.city == filters.city)
+    if filters.state is not None:
+        query = query.filter(model.state == filters.state)
+    if filters.seeking is not None:
+        query = query.filter(func.coalesce(getattr(model, seeking), false()) == filters.seeking)
+    return query
+
+
+@click.command('rebuild-facets')
+@with_appcontext
+def rebuild_facets_command():
+    """Recompute the facet counts used by /venues/browse and /artists/browse."""
+    rebuild(db.session.connection())
+    db.session.commit()
+    click.echo(f'{db.session.query(FacetCount).count()} facet rows')
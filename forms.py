@@ -1,9 +1,9 @@
 from datetime import datetime
-from flask_wtf import Form
+from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
 from wtforms.validators import DataRequired, AnyOf, URL
 
-class ShowForm(Form):
+class ShowForm(FlaskForm):
     artist_id = StringField(
         'artist_id'
     )
@@ -13,10 +13,12 @@ class ShowForm(Form):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
+        # Also ISO 8601, as `flask export` writes datetimes
+        format=['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f'],
         default= datetime.today()
     )
 
-class VenueForm(Form):
+class VenueForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -121,8 +123,9 @@ class VenueForm(Form):
         'website_link', validators = [URL()]
     )
 
+    # Unchecked is a valid answer; DataRequired would reject it
     seeking_talent = BooleanField( 
-        'seeking_talent', validators = [DataRequired()] 
+        'seeking_talent'
         )
 
     seeking_description = StringField(
@@ -131,7 +134,7 @@ class VenueForm(Form):
 
 
 
-class ArtistForm(Form):
+class ArtistForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -235,7 +238,7 @@ class ArtistForm(Form):
      )
 
     seeking_venue = BooleanField( 
-        'seeking_venue', validators = [DataRequired()]
+        'seeking_venue'
          )
 
     seeking_description = StringField(
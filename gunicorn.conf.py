@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+
+
+# gunicorn settings, all overridable from the environment:
+#
+#     gunicorn -c gunicorn.conf.py wsgi:app
+#
+# WEB_CONCURRENCY        worker processes (default 2 * CPUs + 1)
+# GUNICORN_WORKER_CLASS  sync | gthread | gevent | ... (default gthread)
+# GUNICORN_THREADS       threads per gthread worker (default 4)
+# GUNICORN_KEEPALIVE     seconds to hold idle keep-alive connections (default 5)
+# GUNICORN_MAX_REQUESTS  recycle a worker after this many requests (default
+#                        1000, 0 disables), plus up to GUNICORN_MAX_REQUESTS_JITTER
+#                        so the workers do not restart together
+# GUNICORN_TIMEOUT       seconds before a silent worker is killed (default 30)
+#
+# Every worker has its own database pool (config.DB_POOL_SIZE and
+# DB_MAX_OVERFLOW); the total is logged on startup.
+# Every worker also has its own CACHE_TYPE=simple response cache, which the
+# other workers' writes do not invalidate; a warning is logged when that
+# combination starts with more than one worker.
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:%s' % os.environ.get('PORT', '8000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Load the app in each worker, not in the master, so no database connection
+# is ever shared across a fork
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    import config
+
+    per_worker = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+    concurrency = threads if worker_class == 'gthread' else 1
+    server.log.info('%d workers x %d %s; up to %d database connections '
+                    '(%d x (DB_POOL_SIZE %d + DB_MAX_OVERFLOW %d))',
+                    workers, concurrency, 'threads' if concurrency > 1 else 'thread',
+                    workers * per_worker, workers, config.DB_POOL_SIZE,
+                    config.DB_MAX_OVERFLOW)
+    if worker_class == 'gthread' and config.DB_POOL_SIZE < threads:
+        server.log.warning('DB_POOL_SIZE %d is below GUNICORN_THREADS %d; requests '
+                           'will queue for connections', config.DB_POOL_SIZE, threads)
+    if config.CACHE_TYPE == 'simple' and workers > 1:
+        server.log.warning('CACHE_TYPE=simple with %d workers: each worker caches pages '
+                           'separately and serves them up to CACHE_DEFAULT_TIMEOUT (%ds) '
+                           'after another worker changed them; use CACHE_TYPE=redis',
+                           workers, config.CACHE_DEFAULT_TIMEOUT)
@@ -0,0 +1,58 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from models import db
+
+
+# Primary-key lookups of venues, artists and shows that never fetch a row
+# twice in one request. db.session lives for one request (Flask-SQLAlchemy
+# removes it at teardown) and its identity map holds every row loaded so far,
+# so a row found there costs no query. On top of that the session remembers
+# ids that do not exist, and get_many() loads all ids it has not seen with one
+# IN query.
+
+
+def _ids(idents):
+    # Route values may be strings (/venues/<venue_id>/delete); an id that is
+    # not a number cannot exist
+    ids = []
+    for ident in idents:
+        try:
+            ids.append(int(ident))
+        except (TypeError, ValueError):
+            pass
+    return list(dict.fromkeys(ids))
+
+
+def get_many(model, idents):
+    """{id: instance} for those of the ids that exist, in at most one query."""
+    session = db.session()
+    misses = session.info.setdefault('identity_misses', set())
+    found, missing = {}, []
+    for ident in _ids(idents):
+        if identity_key(model, ident) in session.identity_map:
+            # Refreshes an expired row; None if it was deleted in this session
+            instance = session.get(model, ident)
+            if instance is not None:
+                found[ident] = instance
+        elif (model, ident) not in misses:
+            missing.append(ident)
+    if missing:
+        for instance in session.scalars(select(model).where(model.id.in_(missing))):
+            found[instance.id] = instance
+        misses.update((model, ident) for ident in missing if ident not in found)
+    return found
+
+
+def get(model, ident):
+    """The instance with this primary key, or None."""
+    ids = _ids([ident])
+    return get_many(model, ids).get(ids[0]) if ids else None
+
+
+@event.listens_for(Session, 'after_flush')
+def _forget_misses(session, flush_context):
+    # A flush may have inserted one of the ids remembered as missing
+    if session.new:
+        session.info.pop('identity_misses', None)
@@ -0,0 +1,341 @@
+import csv
+import io
+import json
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, text
+from werkzeug.datastructures import MultiDict
+
+from facets import record_inserts
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, Genre, venue_genre_table, artist_genre_table
+from show_counts import refresh_for_shows
+
+
+# `flask import` -- bulk load partner catalogues.
+# Rows are streamed from CSV or NDJSON, validated with the same forms the
+# create pages use, and written one batch per transaction: shows with COPY on
+# Postgres, venues and artists with a multi-row INSERT ... RETURNING so their
+# genre links go in the same transaction. After each committed batch the
+# position is saved to a checkpoint file so an interrupted import can be
+# resumed with --resume; rejected rows go to an NDJSON error report.
+
+IMPORTERS = {
+    'venues': (Venue, VenueForm),
+    'artists': (Artist, ArtistForm),
+    'shows': (Show, ShowForm),
+}
+
+# Form fields that hold several values; CSV cells separate them with ';'
+LIST_FIELDS = ('genres',)
+
+# Checkbox fields, and the text values that mean unchecked: `flask export`
+# writes False to CSV, and BooleanField treats any non-empty value as checked
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+FALSE_STRINGS = {'', 'false', 'f', '0', 'no', 'n', 'off'}
+
+# Genres are stored through these association tables, not on the row; the
+# column that links to the venue/artist
+GENRE_LINKS = {
+    Venue: venue_genre_table.c.venues_id,
+    Artist: artist_genre_table.c.artists_id,
+}
+
+
+def read_records(path, fmt):
+    # Yields (record number, dict) without loading the whole file. A line that
+    # is not JSON is yielded as its ValueError, for validate() to reject
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for number, record in enumerate(csv.DictReader(f), 1):
+                yield number, record
+        else:
+            number = 0
+            for line in f:
+                if line.strip():
+                    number += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        record = e
+                    yield number, record
+
+
+def to_formdata(record):
+    formdata = MultiDict()
+    for key, value in record.items():
+        if value is None:
+            continue
+        if key in LIST_FIELDS:
+            values = value if isinstance(value, list) else str(value).split(';')
+            formdata.setlist(key, [v.strip() for v in values if str(v).strip()])
+        elif isinstance(value, bool) or key in BOOLEAN_FIELDS:
+            if isinstance(value, str):
+                value = value.strip().lower() not in FALSE_STRINGS
+            formdata[key] = 'y' if value else ''
+        else:
+            formdata[key] = str(value)
+    return formdata
+
+
+def validate(model, form_class, record):
+    # Returns (row, None) for a valid record or (None, errors)
+    if isinstance(record, ValueError):
+        return None, {'record': [f'Not valid JSON: {record}']}
+    if not isinstance(record, dict):
+        return None, {'record': ['Must be a JSON object.']}
+    form = form_class(formdata=to_formdata(record), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    row = {name: value for name, value in form.data.items()
+           if name in model.__table__.columns or name in LIST_FIELDS}
+    if model is Show:
+        try:
+            row['artist_id'] = int(row['artist_id'])
+            row['venue_id'] = int(row['venue_id'])
+        except (TypeError, ValueError):
+            return None, {'artist_id/venue_id': ['Must be integers.']}
+    if record.get('id') not in (None, ''):
+        try:
+            row['id'] = int(record['id'])
+        except (TypeError, ValueError):
+            return None, {'id': ['Must be an integer.']}
+    return row, None
+
+
+def check_show_references(rows):
+    # One query per referenced table for the whole batch
+    valid = []
+    rejected = []
+    artist_ids = {row['artist_id'] for _, row in rows}
+    venue_ids = {row['venue_id'] for _, row in rows}
+    known_artists = {i for (i,) in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+    known_venues = {i for (i,) in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+    for number, row in rows:
+        errors = {}
+        if row['artist_id'] not in known_artists:
+            errors['artist_id'] = ['No artist with this id.']
+        if row['venue_id'] not in known_venues:
+            errors['venue_id'] = ['No venue with this id.']
+        if errors:
+            rejected.append((number, errors))
+        else:
+            valid.append((number, row))
+    return valid, rejected
+
+
+def copy_rows(table, rows):
+    # COPY ... FROM STDIN through the raw DBAPI connection (psycopg2)
+    columns = sorted({column for row in rows for column in row})
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if row.get(c) is None else row.get(c) for c in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '\\N')" % (table.name, ', '.join(columns)),
+        buffer)
+
+
+def genre_ids(names):
+    # Maps genre name -> id, inserting the names not seen before
+    known = dict(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(names)))
+    missing = sorted(set(names) - set(known))
+    if missing:
+        result = db.session.execute(
+            insert(Genre.__table__).returning(
+                Genre.__table__.c.id, sort_by_parameter_order=True),
+            [{'name': name} for name in missing])
+        known.update(zip(missing, result.scalars()))
+    return known
+
+
+def write_genre_rows(model, rows):
+    # Entities first (RETURNING their ids in order), then the genre links
+    genres = [row.pop('genres', None) or [] for row in rows]
+    table = model.__table__
+    result = db.session.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+    ids = result.scalars().all()
+
+    owner = GENRE_LINKS[model]
+    by_name = genre_ids({name for names in genres for name in names})
+    pairs = [{'genres_id': by_name[name], owner.name: entity_id}
+             for entity_id, names in zip(ids, genres) for name in set(names)]
+    if pairs:
+        db.session.execute(insert(owner.table), pairs)
+    record_inserts(db.session.connection(), model, ids)
+
+
+def write_rows(model, rows):
+    # A multi-row INSERT (or COPY) needs the same columns in every row, so
+    # rows with an explicit id go first, then the rest; moving the serial past
+    # the new ids in between keeps the two from colliding
+    with_id = [row for row in rows if 'id' in row]
+    without_id = [row for row in rows if 'id' not in row]
+    if with_id:
+        write_group(model, with_id)
+        if without_id:
+            advance_sequence(model)
+    if without_id:
+        write_group(model, without_id)
+
+
+def write_group(model, rows):
+    if model in GENRE_LINKS:
+        write_genre_rows(model, rows)
+        return
+    if db.engine.dialect.driver == 'psycopg2':
+        copy_rows(model.__table__, rows)
+    else:
+        db.session.execute(insert(model.__table__), rows)
+    # Core inserts skip the ORM events that keep the show counters current
+    refresh_for_shows(db.session.connection(),
+                      ((row['venue_id'], row['artist_id']) for row in rows))
+
+
+def advance_sequence(model):
+    # Explicit ids bypass the serial; move it past the highest id
+    if db.engine.dialect.name == 'postgresql':
+        table = model.__tablename__
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+            "coalesce((SELECT max(id) FROM %s), 0) + 1, false)" % table), {'table': table})
+
+
+def reset_sequence(model):
+    advance_sequence(model)
+    db.session.commit()
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def invalidate_pages(model, rows):
+    # Only a shared (Redis) cache can be invalidated from this process; an
+    # in-process one belongs to each web worker and is out of reach
+    response_cache = current_app.extensions.get('response_cache')
+    if response_cache is None or not response_cache.backend.shared:
+        return
+    if model is Show:
+        tags = {'venues', 'shows'}
+        tags.update(f'venue:{row["venue_id"]}' for row in rows)
+        tags.update(f'artist:{row["artist_id"]}' for row in rows)
+    else:
+        tags = {model.__tablename__}
+    response_cache.invalidate(*sorted(tags))
+
+
+def import_file(kind, path, fmt, batch_size, resume, checkpoint_path, errors_path, echo=print):
+    model, form_class = IMPORTERS[kind]
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state and (state['kind'], state['path']) != (kind, os.path.abspath(path)):
+        raise click.ClickException(f'{checkpoint_path} belongs to another import')
+    if not state:
+        state = {'kind': kind, 'path': os.path.abspath(path),
+                 'position': 0, 'inserted': 0, 'rejected': 0, 'batches': 0}
+    skip = state['position']
+    if skip:
+        echo(f'Resuming after record {skip}')
+    response_cache = current_app.extensions.get('response_cache')
+    if response_cache is not None and not response_cache.backend.shared:
+        echo('Note: CACHE_TYPE is per process, so the running workers keep serving '
+             'their cached pages for up to CACHE_DEFAULT_TIMEOUT seconds')
+
+    started = time.perf_counter()
+    with open(errors_path, 'a' if resume else 'w') as report:
+
+        def flush(batch):
+            batch_started = time.perf_counter()
+            valid, rejected = [], []
+            for number, record in batch:
+                row, errors = validate(model, form_class, record)
+                if errors:
+                    rejected.append((number, errors))
+                else:
+                    valid.append((number, row))
+            if model is Show and valid:
+                valid, missing = check_show_references(valid)
+                rejected.extend(missing)
+
+            rows = [row for _, row in valid]
+            if rows:
+                try:
+                    write_rows(model, rows)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    rejected.extend((number, {'database': [str(e).splitlines()[0]]})
+                                    for number, _ in valid)
+                    rows = []
+                else:
+                    invalidate_pages(model, rows)
+
+            for number, errors in sorted(rejected, key=lambda item: item[0]):
+                report.write(json.dumps({'batch': state['batches'] + 1,
+                                         'record': number, 'errors': errors}) + '\n')
+            report.flush()
+
+            state['position'] = batch[-1][0]
+            state['inserted'] += len(rows)
+            state['rejected'] += len(rejected)
+            state['batches'] += 1
+            save_checkpoint(checkpoint_path, state)
+
+            elapsed = time.perf_counter() - batch_started
+            echo(f'batch {state["batches"]}: records {batch[0][0]}-{batch[-1][0]}, '
+                 f'{len(rows)} inserted, {len(rejected)} rejected, '
+                 f'{len(batch) / max(elapsed, 1e-9):.0f} rows/s')
+
+        batch = []
+        for number, record in read_records(path, fmt):
+            if number <= skip:
+                continue
+            batch.append((number, record))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    reset_sequence(model)
+    elapsed = time.perf_counter() - started
+    echo(f'Done: {state["inserted"]} inserted, {state["rejected"]} rejected '
+         f'in {elapsed:.1f}s; errors in {errors_path}')
+    return state
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults from the file extension (.csv, otherwise NDJSON).')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--resume', is_flag=True, help='Continue from the checkpoint file.')
+@click.option('--checkpoint', 'checkpoint_path',
+              help='Defaults to PATH.checkpoint.')
+@click.option('--errors', 'errors_path', help='Defaults to PATH.errors.ndjson.')
+@with_appcontext
+def import_command(kind, path, fmt, batch_size, resume, checkpoint_path, errors_path):
+    """Bulk import venues, artists or shows from a CSV or NDJSON file."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    import_file(kind, path, fmt, batch_size, resume,
+                checkpoint_path or path + '.checkpoint',
+                errors_path or path + '.errors.ndjson',
+                echo=click.echo)
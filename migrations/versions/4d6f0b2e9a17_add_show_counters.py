@@ -0,0 +1,50 @@
+"""add show counters
+
+Revision ID: 4d6f0b2e9a17
+Revises: a92e4c7d18b3
+Create Date: 2026-10-18 17:08:44.915602
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d6f0b2e9a17'
+down_revision = 'a92e4c7d18b3'
+branch_labels = None
+depends_on = None
+
+
+OWNERS = (('venues', 'venue_id'), ('artists', 'artist_id'))
+
+
+def upgrade():
+    for table, column in OWNERS:
+        op.add_column(table, sa.Column('upcoming_show_count', sa.Integer(), nullable=False,
+                                       server_default='0'))
+        op.add_column(table, sa.Column('past_show_count', sa.Integer(), nullable=False,
+                                       server_default='0'))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        op.create_index(op.f('ix_%s_next_show_at' % table), table, ['next_show_at'], unique=False)
+        # Same as `flask sweep-shows --all`; updated_at is left alone
+        op.execute("""
+            UPDATE %(table)s SET
+                upcoming_show_count = counts.upcoming,
+                past_show_count = counts.past,
+                next_show_at = counts.next_show_at
+            FROM (SELECT %(column)s AS id,
+                         count(*) FILTER (WHERE start_time > localtimestamp) AS upcoming,
+                         count(*) FILTER (WHERE start_time <= localtimestamp) AS past,
+                         min(start_time) FILTER (WHERE start_time > localtimestamp) AS next_show_at
+                  FROM shows GROUP BY %(column)s) AS counts
+            WHERE %(table)s.id = counts.id
+        """ % {'table': table, 'column': column})
+
+
+def downgrade():
+    for table, column in OWNERS:
+        op.drop_index(op.f('ix_%s_next_show_at' % table), table_name=table)
+        op.drop_column(table, 'next_show_at')
+        op.drop_column(table, 'past_show_count')
+        op.drop_column(table, 'upcoming_show_count')
@@ -0,0 +1,31 @@
+"""add show indexes
+
+Revision ID: 5b2c9f1e7a34
+Revises: d00fc0dd936e
+Create Date: 2026-10-18 09:12:04.518221
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2c9f1e7a34'
+down_revision = 'd00fc0dd936e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_venue_id_start_time', 'shows',
+                    ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows',
+                    ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_start_time_id', 'shows',
+                    ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
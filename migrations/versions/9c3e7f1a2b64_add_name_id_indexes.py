@@ -0,0 +1,35 @@
+"""name NOT NULL and (name, id) indexes for keyset pagination
+
+Revision ID: 9c3e7f1a2b64
+Revises: 4d6f0b2e9a17
+Create Date: 2026-10-19 09:12:31.407215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e7f1a2b64'
+down_revision = '4d6f0b2e9a17'
+branch_labels = None
+depends_on = None
+
+
+TABLES = (('venues', 'Unnamed venue'), ('artists', 'Unnamed artist'))
+
+
+def upgrade():
+    for table, placeholder in TABLES:
+        # A NULL name never satisfies (name, id) > cursor, so such rows could
+        # only ever appear on the first page
+        op.execute(sa.text('UPDATE %s SET name = :name WHERE name IS NULL' % table).bindparams(
+            name=placeholder))
+        op.alter_column(table, 'name', existing_type=sa.String(), nullable=False)
+        op.create_index('ix_%s_name_id' % table, table, ['name', 'id'], unique=False)
+
+
+def downgrade():
+    for table, _ in TABLES:
+        op.drop_index('ix_%s_name_id' % table, table_name=table)
+        op.alter_column(table, 'name', existing_type=sa.String(), nullable=True)
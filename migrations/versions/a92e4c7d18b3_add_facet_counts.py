@@ -0,0 +1,46 @@
+"""add facet_counts
+
+Revision ID: a92e4c7d18b3
+Revises: f3b8d6a41c57
+Create Date: 2026-10-18 15:41:09.207364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a92e4c7d18b3'
+down_revision = 'f3b8d6a41c57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('facet_counts',
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('seeking', sa.Boolean(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'genre_id', 'city', 'state', 'seeking')
+    )
+    # Same as `flask rebuild-facets`
+    for kind, seeking, links, column in (
+            ('venues', 'seeking_talent', 'venue_genre_table', 'venues_id'),
+            ('artists', 'seeking_venue', 'artist_genre_table', 'artists_id')):
+        op.execute("""
+            INSERT INTO facet_counts (kind, genre_id, city, state, seeking, count)
+            SELECT '%(kind)s', 0, coalesce(city, ''), coalesce(state, ''),
+                   coalesce(%(seeking)s, false), count(*)
+            FROM %(kind)s GROUP BY 3, 4, 5
+            UNION ALL
+            SELECT '%(kind)s', l.genres_id, coalesce(e.city, ''), coalesce(e.state, ''),
+                   coalesce(e.%(seeking)s, false), count(*)
+            FROM %(kind)s e JOIN %(links)s l ON l.%(column)s = e.id GROUP BY 2, 3, 4, 5
+        """ % {'kind': kind, 'seeking': seeking, 'links': links, 'column': column})
+
+
+def downgrade():
+    op.drop_table('facet_counts')
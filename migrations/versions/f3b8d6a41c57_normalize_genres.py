@@ -0,0 +1,61 @@
+"""normalize genres
+
+Revision ID: f3b8d6a41c57
+Revises: c7a1e5d92f08
+Create Date: 2026-10-18 13:02:17.418530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d6a41c57'
+down_revision = 'c7a1e5d92f08'
+branch_labels = None
+depends_on = None
+
+
+LINKS = (('venues', 'venue_genre_table', 'venues_id'),
+         ('artists', 'artist_genre_table', 'artists_id'))
+
+
+def upgrade():
+    op.alter_column('genres', 'name', existing_type=sa.String(), nullable=False)
+    op.create_unique_constraint('genres_name_key', 'genres', ['name'])
+
+    # Move the ARRAY values into genres and the association tables
+    op.execute("""
+        INSERT INTO genres (name)
+        SELECT DISTINCT trim(name) FROM (
+            SELECT unnest(genres) AS name FROM venues
+            UNION SELECT unnest(genres) FROM artists
+        ) AS names
+        WHERE trim(name) <> ''
+        ON CONFLICT (name) DO NOTHING
+    """)
+    for table, links, column in LINKS:
+        op.execute("""
+            INSERT INTO %(links)s (genres_id, %(column)s)
+            SELECT DISTINCT genres.id, %(table)s.id
+            FROM %(table)s CROSS JOIN LATERAL unnest(%(table)s.genres) AS name
+            JOIN genres ON genres.name = trim(name)
+            ON CONFLICT DO NOTHING
+        """ % {'table': table, 'links': links, 'column': column})
+        op.create_index(op.f('ix_%s_%s' % (links, column)), links, [column], unique=False)
+        op.drop_column(table, 'genres')
+
+
+def downgrade():
+    for table, links, column in LINKS:
+        op.add_column(table, sa.Column('genres', sa.ARRAY(sa.String()), nullable=True))
+        op.execute("""
+            UPDATE %(table)s SET genres = names.genres
+            FROM (SELECT %(links)s.%(column)s AS id, array_agg(genres.name ORDER BY genres.name) AS genres
+                  FROM %(links)s JOIN genres ON genres.id = %(links)s.genres_id
+                  GROUP BY %(links)s.%(column)s) AS names
+            WHERE %(table)s.id = names.id
+        """ % {'table': table, 'links': links, 'column': column})
+        op.drop_index(op.f('ix_%s_%s' % (links, column)), table_name=links)
+    op.drop_constraint('genres_name_key', 'genres', type_='unique')
+    op.alter_column('genres', 'name', existing_type=sa.String(), nullable=True)
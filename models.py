@@ -1,12 +1,34 @@
-from sqlalchemy import String, ARRAY
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import Session
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from db_pool import TimedQueuePool
 db = SQLAlchemy()
 
 
+def engine_options(config):
+    # Pool settings only apply to a real server; SQLite uses its own pools
+    if not config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        return {}
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if config['DB_STATEMENT_TIMEOUT']:
+        options['connect_args'] = {
+            'options': '-c statement_timeout=%d' % config['DB_STATEMENT_TIMEOUT']}
+    return options
+
+
 def db_setup(app):
 
     app.config.from_object('config')
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     db.app = app
     db.init_app(app)
     migrate = Migrate(app, db)
@@ -14,41 +36,54 @@ def db_setup(app):
 
 
 
-class Genre(db.Model):
-    __tablename__ = 'genres'
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+# Genres live in their own table, linked to artists and venues through these
+# association tables. The primary keys lead with genres_id, which serves
+# browse-by-genre; the second index serves loading an entity's genres.
+artist_genre_table = db.Table('artist_genre_table',
+                              db.Column('genres_id', db.Integer, db.ForeignKey(
+                                  'genres.id'), primary_key=True),
+                              db.Column('artists_id', db.Integer, db.ForeignKey(
+                                  'artists.id'), primary_key=True),
+                              db.Index('ix_artist_genre_table_artists_id', 'artists_id')
+                              )
 
-    artist_genre_table = db.Table('artist_genre_table',
-                                  db.Column('genres_id', db.Integer, db.ForeignKey(
-                                      'genres.id'), primary_key=True),
-                                  db.Column('artists_id', db.Integer, db.ForeignKey(
-                                      'artists.id'), primary_key=True)
-                                  )
+venue_genre_table = db.Table('venue_genre_table',
+                             db.Column('genres_id', db.Integer, db.ForeignKey(
+                                 'genres.id'), primary_key=True),
+                             db.Column('venues_id', db.Integer, db.ForeignKey(
+                                 'venues.id'), primary_key=True),
+                             db.Index('ix_venue_genre_table_venues_id', 'venues_id')
+                             )
 
-    venue_genre_table = db.Table('venue_genre_table',
-                                 db.Column('genres_id', db.Integer, db.ForeignKey(
-                                     'genres.id'), primary_key=True),
-                                 db.Column('venues_id', db.Integer, db.ForeignKey(
-                                     'venues.id'), primary_key=True)
-                                 )
 
+class Genre(db.Model):
+    __tablename__ = 'genres'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False, unique=True)
 
-artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'),
-                      nullable=False)
-
+    @classmethod
+    def named(cls, name):
+        # Existing genre with this name, or a new one to be inserted
+        genre = cls.query.filter_by(name=name).first()
+        return genre if genre is not None else cls(name=name)
 
-def __repr__(self, name, artists_genre_table, venue_genre_table):
-    self.name = name
-    self.artists_genre_table = artists_genre_table
-    self.venue_genre_table = venue_genre_table
+    def __repr__(self):
+        return f'<Genre {self.id} {self.name}>'
 
 
 class Venue(db.Model):
     __tablename__ = 'venues'
+    # Trigram index backing name search (needs the pg_trgm extension); the
+    # (name, id) btree serves the keyset-paginated listings, which order and
+    # seek on exactly that pair
+    __table_args__ = (
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venues_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
@@ -58,13 +93,25 @@ class Venue(db.Model):
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
-    genres = db.Column(ARRAY(String))
+    genre_list = db.relationship('Genre', secondary=venue_genre_table,
+                                 order_by='Genre.name', lazy=True)
+    # Plain list of genre names, as the forms and templates expect
+    genres = association_proxy('genre_list', 'name', creator=Genre.named)
 
     website_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
-
-    shows = db.relationship('Show', backref='venue_list', lazy=True)
+    # Bumped on every write; drives `flask export --since`
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           server_default=db.func.now(), onupdate=db.func.now())
+    # Show counters kept current by show_counts.py; next_show_at tells the
+    # sweep which rows to recount once that show has started
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime, index=True)
+
+    shows = db.relationship('Show', backref='venue_list', lazy=True,
+                            cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Venue {self.id} {self.name}>'
@@ -72,33 +119,67 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'artists'
+    # Trigram index backing name search (needs the pg_trgm extension); the
+    # (name, id) btree serves the keyset-paginated listings, which order and
+    # seek on exactly that pair
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    # genres = db.Column(db.String(120))
-    genres = db.relationship('Genre', backref='artist', lazy=True)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
 
-    genres = db.Column(ARRAY(String))
+    genre_list = db.relationship('Genre', secondary=artist_genre_table,
+                                 order_by='Genre.name', lazy=True)
+    # Plain list of genre names, as the forms and templates expect
+    genres = association_proxy('genre_list', 'name', creator=Genre.named)
 
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
-
-    shows = db.relationship('Show', backref='artist_list', lazy=True)
+    # Bumped on every write; drives `flask export --since`
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           server_default=db.func.now(), onupdate=db.func.now())
+    # Show counters kept current by show_counts.py; next_show_at tells the
+    # sweep which rows to recount once that show has started
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime, index=True)
+
+    shows = db.relationship('Show', backref='artist_list', lazy=True,
+                            cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Artist: {self.id} {self.name}>'
 
 
+@event.listens_for(Session, 'before_flush')
+def _touch_on_genre_change(session, flush_context, instances):
+    # Genres live in the association tables, so changing only them would not
+    # update the row; updated_at must move anyway (export --since, API ETags)
+    for obj in session.dirty:
+        if isinstance(obj, (Venue, Artist)) and inspect(obj).attrs.genre_list.history.has_changes():
+            obj.updated_at = db.func.now()
+
+
 class Show(db.Model):
     __tablename__ = 'shows'
+    # Every venue/artist page filters on the foreign key and splits on start_time,
+    # and /shows pages through (start_time, id)
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
@@ -107,6 +188,25 @@ class Show(db.Model):
         'artists.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey(
         'venues.id'), nullable=False)
+    # Bumped on every write; drives `flask export --since`
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           server_default=db.func.now(), onupdate=db.func.now())
+
+    def __repr__(self):
+        return f'<Show: {self.id} {self.start_time}>'
+
+class FacetCount(db.Model):
+    # Precomputed browse counts, kept current by facets.py: the number of
+    # venues/artists (kind) per genre, city/state and seeking flag.
+    # genre_id 0 counts every entity once, whatever its genres.
+    __tablename__ = 'facet_counts'
+
+    kind = db.Column(db.String(16), primary_key=True)
+    genre_id = db.Column(db.Integer, primary_key=True)
+    city = db.Column(db.String(120), primary_key=True)
+    state = db.Column(db.String(120), primary_key=True)
+    seeking = db.Column(db.Boolean, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
     def __repr__(self):
-        return f'<Show: {self.id} {self.start_time}>'
\ No newline at end of file
+        return f'<FacetCount {self.kind} {self.genre_id} {self.city} {self.state} {self.seeking}: {self.count}>'
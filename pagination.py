@@ -0,0 +1,81 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+# Keyset (cursor) pagination.
+# Pages are addressed by the (sort key, id) of their first/last row rather than
+# by an OFFSET, so fetching page 1000 costs the same index range scan as page 1.
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor', 'limit'])
+
+
+def get_limit(args, default, maximum):
+    # Read ?limit= from the query string, clamped to [1, maximum]
+    try:
+        limit = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(key, row_id):
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([key, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, key_column):
+    # Returns (key, id), or None if the cursor is missing or malformed
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if key_column.type.python_type is datetime:
+            key = datetime.fromisoformat(key)
+        return key, int(row_id)
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+def paginate(query, key_column, id_column, after=None, before=None, limit=20):
+    """Return one Page of `query` ordered by (key_column, id_column).
+
+    `after` / `before` are cursors taken from a previous Page; rows must expose
+    the key and id under the same names as the two columns.
+    """
+    key_name = key_column.key
+    id_name = id_column.key
+    keyset = tuple_(key_column, id_column)
+
+    before = decode_cursor(before, key_column)
+    after = decode_cursor(after, key_column) if before is None else None
+
+    if before is not None:
+        # Walk backwards from the cursor, then flip back into display order
+        rows = query.filter(keyset < tuple_(*before)).order_by(
+            key_column.desc(), id_column.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        prev_row = rows[0] if has_more and rows else None
+        next_row = rows[-1] if rows else None
+    else:
+        if after is not None:
+            query = query.filter(keyset > tuple_(*after))
+        rows = query.order_by(key_column, id_column).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_row = rows[-1] if has_more else None
+        prev_row = rows[0] if after is not None and rows else None
+
+    def cursor_for(row):
+        if row is None:
+            return None
+        return encode_cursor(getattr(row, key_name), getattr(row, id_name))
+
+    return Page(rows, cursor_for(next_row), cursor_for(prev_row), limit)
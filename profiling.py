@@ -0,0 +1,136 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Per-request profiling: latency per route, SQL query count and database time
+# per request, a log line with the query list for slow requests, and the
+# totals at /metrics in the Prometheus text format.
+# With PROFILING off nothing is registered at all: no request hooks, no
+# cursor events and no /metrics route. The numbers are per worker process;
+# Prometheus scrapes and sums each worker (or instance) separately.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram(object):
+    """Prometheus-style cumulative histogram, one series per label tuple."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label_values, value):
+        # Caller holds the profiler lock
+        counts, total = self.series.get(label_values, (None, 0))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[label_values] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total) in sorted(self.series.items()):
+            labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class Profiler(object):
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.slow_seconds = 0.5
+        self.latency = Histogram(
+            'fyyur_request_duration_seconds', 'Request latency by route.',
+            ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+        self.queries = Histogram(
+            'fyyur_request_db_queries', 'SQL statements per request by route.',
+            ('endpoint', 'method'), QUERY_BUCKETS)
+        self.db_time = Histogram(
+            'fyyur_request_db_seconds', 'Time spent in SQL per request by route.',
+            ('endpoint', 'method'), LATENCY_BUCKETS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        if not app.config.get('PROFILING', False):
+            return
+        self.slow_seconds = app.config.get('PROFILING_SLOW_REQUEST_MS', 500) / 1000.0
+        self.logger = app.logger
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        app.add_url_rule(app.config.get('PROFILING_METRICS_PATH', '/metrics'),
+                         'metrics', self.metrics_view)
+
+    # SQL
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('profiling_started')
+        if not stack:
+            return
+        started = stack.pop()
+        # Statements outside a request (CLI, startup) are not attributed
+        if has_app_context() and 'profile' in g:
+            g.profile.append((statement, time.perf_counter() - started))
+
+    # Requests
+
+    def _start(self):
+        g.profile = []
+        g.profile_started = time.perf_counter()
+
+    def _finish(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown(self, exc):
+        # Unhandled exceptions skip after_request
+        if exc is not None and 'profile_started' in g:
+            self._record(500)
+
+    def _record(self, status):
+        elapsed = time.perf_counter() - g.pop('profile_started')
+        statements = g.profile
+        endpoint = request.endpoint or 'unmatched'
+        db_seconds = sum(duration for _, duration in statements)
+        with self.lock:
+            self.latency.observe((endpoint, request.method, str(status)), elapsed)
+            self.queries.observe((endpoint, request.method), len(statements))
+            self.db_time.observe((endpoint, request.method), db_seconds)
+        if elapsed >= self.slow_seconds:
+            self.logger.warning(
+                'Slow request %s %s: %.0f ms, %d queries, %.0f ms in SQL%s',
+                request.method, request.full_path.rstrip('?'), elapsed * 1000,
+                len(statements), db_seconds * 1000, ''.join(
+                    '\n  %7.1f ms  %s' % (duration * 1000, ' '.join(statement.split()))
+                    for statement, duration in statements))
+
+    def render(self):
+        with self.lock:
+            lines = self.latency.render() + self.queries.render() + self.db_time.render()
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
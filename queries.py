@@ -0,0 +1,142 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from models import db, Venue, Artist, Show, Genre, venue_genre_table, artist_genre_table
+
+
+# Read queries shared by the HTML views in app.py and the JSON API in api.py.
+
+# Worker threads for run_concurrently(), created on first use
+_executor = None
+
+
+def upcoming_show_counts(model, ids):
+    # Maps venue/artist id -> number of future shows, from the counters
+    # maintained by show_counts.py
+    if not ids:
+        return {}
+    rows = db.session.query(model.id, model.upcoming_show_count).filter(model.id.in_(ids))
+    return dict(rows.all())
+
+
+def show_listing():
+    # Every show with the venue and artist columns the listings need
+    return db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(
+        Artist, Show.artist_id == Artist.id)
+
+
+def venue_shows(venue_id):
+    # All of a venue's shows with their artist, oldest first
+    return db.session.query(
+        Show.start_time,
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Artist, Show.artist_id == Artist.id).filter(
+        Show.venue_id == venue_id).order_by(Show.start_time).all()
+
+
+def artist_shows(artist_id):
+    # All of an artist's shows with their venue, oldest first
+    return db.session.query(
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).filter(
+        Show.artist_id == artist_id).order_by(Show.start_time).all()
+
+
+def split_by_time(shows, now=None):
+    # Partition rows into (past, upcoming) against a single snapshot of now
+    now = now or datetime.now()
+    past, upcoming = [], []
+    for show in shows:
+        (past if show.start_time < now else upcoming).append(show)
+    return past, upcoming
+
+
+def genre_facets():
+    # Every genre with its venue and artist counts; each count is an index-only
+    # lookup on the association table's (genres_id, ...) primary key
+    venue_count = db.session.query(func.count()).select_from(venue_genre_table).filter(
+        venue_genre_table.c.genres_id == Genre.id).scalar_subquery()
+    artist_count = db.session.query(func.count()).select_from(artist_genre_table).filter(
+        artist_genre_table.c.genres_id == Genre.id).scalar_subquery()
+    return db.session.query(
+        Genre.id,
+        Genre.name,
+        venue_count.label('venue_count'),
+        artist_count.label('artist_count')
+    ).order_by(Genre.name).all()
+
+
+def run_concurrently(statements, threads):
+    # Executes independent SELECTs at the same time, each on its own pooled
+    # connection, and returns their rows in order. The session is bound to
+    # the request's thread, so the workers use the engine directly.
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='detail-query')
+    engine = db.engine
+
+    def fetch(statement):
+        with engine.connect() as connection:
+            return connection.execute(statement).all()
+
+    # Each worker runs in a copy of the request's context, so per-request
+    # bookkeeping (profiling.py) still sees its queries
+    futures = [_executor.submit(contextvars.copy_context().run, fetch, statement)
+               for statement in statements]
+    return [future.result() for future in futures]
+
+
+DETAILS = {
+    # model: (show column of the model, counterpart model, counterpart prefix,
+    #         show column of the counterpart, genre link column of the model)
+    Venue: (Show.venue_id, Artist, 'artist', Show.artist_id, venue_genre_table.c.venues_id),
+    Artist: (Show.artist_id, Venue, 'venue', Show.venue_id, artist_genre_table.c.artists_id),
+}
+
+
+def detail(model, entity_id, concurrent=False, threads=8, now=None):
+    # (entity row or None, genre names, past shows, upcoming shows) for a
+    # venue/artist page; with `concurrent` the four reads run at the same time
+    owner, other, prefix, other_owner, genre_owner = DETAILS[model]
+    now = now or datetime.now()
+
+    def shows(*criteria):
+        return select(
+            Show.start_time,
+            other.id.label(f'{prefix}_id'),
+            other.name.label(f'{prefix}_name'),
+            other.image_link.label(f'{prefix}_image_link')
+        ).join(other, other_owner == other.id).where(
+            owner == entity_id, *criteria).order_by(Show.start_time)
+
+    statements = [
+        select(model.__table__).where(model.id == entity_id),
+        select(Genre.name).join(
+            genre_owner.table, genre_owner.table.c.genres_id == Genre.id).where(
+            genre_owner == entity_id).order_by(Genre.name),
+    ]
+    if concurrent:
+        statements += [shows(Show.start_time < now), shows(Show.start_time >= now)]
+        entity, genres, past, upcoming = run_concurrently(statements, threads)
+    else:
+        # One after the other, a single shows query split in Python is cheaper
+        statements.append(shows())
+        entity, genres, all_shows = [db.session.execute(s).all() for s in statements]
+        past, upcoming = split_by_time(all_shows, now)
+    return (entity[0] if entity else None), [name for (name,) in genres], past, upcoming
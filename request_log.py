@@ -0,0 +1,55 @@
+import json
+import threading
+import time
+
+from flask import g, request
+
+
+# Optional JSON-lines log of the requests the app serves, for replaying as a
+# load test (benchmarks/replay.py). One line per request: wall-clock time,
+# method, path with query string, form body, endpoint, status and duration.
+# The CSRF token is left out of the form body (it would not verify on replay);
+# everything else the user typed is recorded, so keep the file private.
+# Workers append to the same file: each line is written with a single write
+# call to a file opened in append mode.
+
+SKIPPED_FIELDS = {'csrf_token'}
+
+
+class RequestLog(object):
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.file = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['request_log'] = self
+        path = app.config.get('REQUEST_LOG_FILE')
+        if not path:
+            return
+        self.file = open(path, 'a', buffering=1, encoding='utf-8')
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.request_log_started = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.pop('request_log_started', None)
+        if started is None:
+            return response
+        form = {key: values for key, values in request.form.lists() if key not in SKIPPED_FIELDS}
+        line = json.dumps({
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'form': form or None,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + '\n')
+        return response
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from models import db
+
+
+# Name search for venues and artists.
+# On Postgres the match runs against a pg_trgm GIN index on name (migration
+# 8e41d0c3b6f2), so ILIKE '%term%' is an index lookup rather than a sequential
+# scan, and results are ranked by trigram similarity. Other databases (SQLite
+# in development) fall back to an in-process trigram index that is rebuilt
+# lazily after a commit that wrote to the table. Writes from other processes
+# (other workers, `flask import`, Core inserts) fire no events here, so each
+# search first compares the table's row count, max id and max updated_at with
+# those the index was built from, and the index is rebuilt at the latest
+# after NGRAM_INDEX_MAX_AGE seconds for writes none of those reveal.
+
+NGRAM_INDEX_MAX_AGE = 300
+
+SearchHit = namedtuple('SearchHit', ['id', 'name'])
+
+
+def trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class NgramIndex(object):
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self.names = None
+        self.postings = None
+        self.generation = 0
+        self.built_from = None
+        self.built_at = 0.0
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, self.mark_dirty)
+
+    def mark_dirty(self, mapper, connection, target):
+        # Only drop the index once the write is committed and visible to others
+        object_session(target).info.setdefault('ngram_dirty', set()).add(self)
+
+    def invalidate(self):
+        self.generation += 1
+        self.names = None
+
+    def signature(self):
+        model = self.model
+        return tuple(db.session.query(
+            func.count(model.id), func.max(model.id), func.max(model.updated_at)).one())
+
+    def is_stale(self, signature):
+        return (self.names is None or signature != self.built_from
+                or time.monotonic() - self.built_at > NGRAM_INDEX_MAX_AGE)
+
+    def build(self, signature):
+        generation = self.generation
+        names = {}
+        postings = {}
+        for row_id, name in db.session.query(self.model.id, self.model.name):
+            name = name or ''
+            names[row_id] = name
+            for gram in trigrams(name):
+                postings.setdefault(gram, set()).add(row_id)
+        if generation == self.generation:
+            self.names, self.postings = names, postings
+            self.built_from, self.built_at = signature, time.monotonic()
+        return names, postings
+
+    def search(self, term):
+        with self.lock:
+            signature = self.signature()
+            names, postings = self.names, self.postings
+            if self.is_stale(signature):
+                names, postings = self.build(signature)
+
+        needle = term.lower()
+        grams = trigrams(needle)
+        if grams:
+            # Candidates must contain every trigram of the term
+            candidates = set.intersection(*(postings.get(g, set()) for g in grams))
+        else:
+            candidates = names.keys()
+
+        hits = []
+        for row_id in candidates:
+            name = names[row_id]
+            if needle in name.lower():
+                name_grams = trigrams(name)
+                union = len(grams | name_grams) or 1
+                hits.append((-len(grams & name_grams) / union, name, row_id))
+        hits.sort()
+        return [SearchHit(row_id, name) for _, name, row_id in hits]
+
+
+_fallback_indexes = {}
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_ngram_indexes(session):
+    for index in session.info.pop('ngram_dirty', ()):
+        index.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_ngram_dirty(session):
+    session.info.pop('ngram_dirty', None)
+
+
+def search_by_name(model, term):
+    # Returns SearchHits for `model` rows whose name contains `term`, best match first
+    if db.engine.dialect.name == 'postgresql':
+        query = db.session.query(model.id, model.name).filter(
+            model.name.ilike('%' + escape_like(term) + '%', escape='\\'))
+        if term:
+            query = query.order_by(func.similarity(model.name, term).desc())
+        return [SearchHit(row.id, row.name) for row in query.order_by(model.name, model.id)]
+
+    if model not in _fallback_indexes:
+        _fallback_indexes[model] = NgramIndex(model)
+    return _fallback_indexes[model].search(term)
@@ -0,0 +1,140 @@
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Venue, Artist, Show
+
+
+# Read model for "how many upcoming/past shows" per venue and artist.
+# venues/artists carry upcoming_show_count, past_show_count and next_show_at so
+# listing and search pages read two integers instead of aggregating shows.
+# Writes to shows recount their venue and artist in the same transaction;
+# a show moves from upcoming to past only by the clock, so `flask sweep-shows`,
+# run every minute from cron, recounts the rows whose next_show_at has passed
+# (an index range scan that is usually empty). Web requests never write the
+# counters themselves.
+
+OWNER_COLUMNS = {
+    Venue: 'venue_id',
+    Artist: 'artist_id',
+}
+
+
+def refresh(connection, model, ids, now=None):
+    # Recounts the given venues/artists from shows with one UPDATE
+    if not ids:
+        return
+    now = now or datetime.now()
+    table = model.__table__
+    shows = Show.__table__
+    owner = shows.c[OWNER_COLUMNS[model]]
+
+    def of_owner(aggregate, *criteria):
+        return select(aggregate).where(owner == table.c.id, *criteria).scalar_subquery()
+
+    # Lock the rows first (in id order, venues before artists everywhere):
+    # under READ COMMITTED the UPDATE's subqueries count with the snapshot of
+    # the statement, so two transactions adding shows to one venue at once
+    # would each miss the other's show. Waiting for the lock here makes the
+    # second one count after the first has committed.
+    ids = sorted(ids)
+    connection.execute(select(table.c.id).where(table.c.id.in_(ids))
+                       .order_by(table.c.id).with_for_update())
+    connection.execute(table.update().where(table.c.id.in_(ids)).values(
+        upcoming_show_count=of_owner(func.count(shows.c.id), shows.c.start_time > now),
+        past_show_count=of_owner(func.count(shows.c.id), shows.c.start_time <= now),
+        next_show_at=of_owner(func.min(shows.c.start_time), shows.c.start_time > now),
+        # Derived data, not an edit: keep `flask export --since` quiet
+        updated_at=table.c.updated_at))
+
+
+def refresh_for_shows(connection, shows):
+    # shows: (venue_id, artist_id) pairs that were inserted, moved or deleted
+    shows = list(shows)
+    refresh(connection, Venue, {venue_id for venue_id, _ in shows})
+    refresh(connection, Artist, {artist_id for _, artist_id in shows})
+
+
+def sweep(connection, now=None):
+    # Recounts every venue/artist whose next show has started; returns the
+    # swept ids per model
+    now = now or datetime.now()
+    swept = {}
+    for model in OWNER_COLUMNS:
+        table = model.__table__
+        ids = [row_id for (row_id,) in connection.execute(
+            select(table.c.id).where(table.c.next_show_at <= now))]
+        refresh(connection, model, ids, now)
+        swept[model] = ids
+    return swept
+
+
+def invalidate_pages(swept):
+    response_cache = current_app.extensions.get('response_cache')
+    if response_cache is None or not any(swept.values()):
+        return
+    tags = ['venues', 'artists']
+    tags += [f'venue:{i}' for i in swept[Venue]] + [f'artist:{i}' for i in swept[Artist]]
+    response_cache.invalidate(*tags)
+
+
+def _changed_show(mapper, connection, target):
+    owners = object_session(target).info.setdefault('show_owners', set())
+    owners.add((target.venue_id, target.artist_id))
+    # A show moved to another venue/artist also changes the old one's counts
+    state = inspect(target)
+    old_venue = state.attrs.venue_id.history.deleted
+    old_artist = state.attrs.artist_id.history.deleted
+    if old_venue or old_artist:
+        owners.add((old_venue[0] if old_venue else target.venue_id,
+                    old_artist[0] if old_artist else target.artist_id))
+
+
+for _name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Show, _name, _changed_show)
+
+
+def _load_old_owner(target, value, oldvalue, initiator):
+    # Nothing to do: listening with active_history loads the replaced venue_id
+    # or artist_id even when it had expired (after a commit), so that
+    # _changed_show finds it in the history and recounts the old owner too
+    pass
+
+
+for _column in (Show.venue_id, Show.artist_id):
+    event.listen(_column, 'set', _load_old_owner, active_history=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_show_counts(session, flush_context):
+    owners = session.info.pop('show_owners', None)
+    if owners:
+        refresh_for_shows(session.connection(), owners)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_show_owners(session):
+    session.info.pop('show_owners', None)
+
+
+@click.command('sweep-shows')
+@click.option('--all', 'everything', is_flag=True,
+              help='Recount every venue and artist, not only the due ones.')
+@with_appcontext
+def sweep_command(everything):
+    """Move started shows from the upcoming to the past counters."""
+    connection = db.session.connection()
+    if everything:
+        swept = {}
+        for model in OWNER_COLUMNS:
+            swept[model] = [row_id for (row_id,) in connection.execute(select(model.__table__.c.id))]
+            refresh(connection, model, swept[model])
+    else:
+        swept = sweep(connection)
+    db.session.commit()
+    invalidate_pages(swept)
+    click.echo(f'{len(swept[Venue])} venues, {len(swept[Artist])} artists recounted')
@@ -0,0 +1,29 @@
+from jinja2 import FileSystemBytecodeCache
+
+
+# Jinja compiles each template to Python code the first time a process
+# renders it, so every new or recycled worker pays for main.html, the page and
+# the form templates on its first requests.
+# TEMPLATE_BYTECODE_CACHE keeps the compiled code on disk: workers load it
+# instead of compiling, across restarts and deploys (entries are keyed by a
+# checksum of the template source, so edited templates are recompiled).
+# PRELOAD_TEMPLATES compiles every template at startup, before the worker
+# takes requests, rather than on the first request that uses it.
+
+
+def init_app(app):
+    # Call once every filter is registered: compiling checks filter names
+    if app.config.get('TEMPLATE_BYTECODE_CACHE', False):
+        # Without a directory Jinja uses a private per-user one under /tmp
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+            app.config.get('TEMPLATE_BYTECODE_CACHE_DIR'))
+    if app.config.get('PRELOAD_TEMPLATES', False):
+        preload(app)
+
+
+def preload(app):
+    # Returns the names of the compiled templates
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py reads the environment when the app is imported: a throwaway
+# SQLite file and no response cache
+os.environ.update(
+    DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fyyur-test.db'),
+    CACHE_TYPE='null',
+    SECRET_KEY='test-secret',
+    TEMPLATE_BYTECODE_CACHE='0',
+)
+
+from app import app as fyyur_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with fyyur_app.app_context():
+        db.create_all()
+        yield fyyur_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    # Every SQL statement the app runs from here on; clear() it before the
+    # request being counted
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(db.engine, 'before_cursor_execute', record)
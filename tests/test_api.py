@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import db
+from models import Venue, Artist, Show
+
+
+def add_venue_with_show():
+    venue = Venue(name='The Hop', city='Austin', state='TX', genres=['Jazz'])
+    artist = Artist(name='Guns N Petals', city='Austin', state='TX')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                        start_time=datetime.now() + timedelta(days=3)))
+    db.session.commit()
+    return venue.id, artist.id
+
+
+def get(client, path, etag=None):
+    return client.get(path, headers={'If-None-Match': etag} if etag else {})
+
+
+def test_unchanged_venue_is_a_304_from_one_query(client, statements):
+    venue_id, _ = add_venue_with_show()
+    first = get(client, f'/api/v1/venues/{venue_id}')
+    assert first.status_code == 200 and first.json['upcoming_shows_count'] == 1
+
+    statements.clear()
+    again = get(client, f'/api/v1/venues/{venue_id}', first.headers['ETag'])
+    assert again.status_code == 304
+    assert len(statements) == 1
+
+
+def test_venue_etag_changes_with_its_shows_artists(client):
+    venue_id, artist_id = add_venue_with_show()
+    etag = get(client, f'/api/v1/venues/{venue_id}').headers['ETag']
+
+    # SQLite's now() has one-second resolution, so move the clock explicitly
+    with db.engine.begin() as conn:
+        conn.execute(update(Artist.__table__).where(Artist.__table__.c.id == artist_id).values(
+            name='Petals', updated_at=datetime.now() + timedelta(minutes=1)))
+    response = get(client, f'/api/v1/venues/{venue_id}', etag)
+    assert response.status_code == 200
+    assert response.json['upcoming_shows'][0]['artist_name'] == 'Petals'
+
+
+def test_missing_venue_is_404(client):
+    assert client.get('/api/v1/venues/999').status_code == 404
+
+
+def test_changing_only_genres_bumps_updated_at(app):
+    venue_id, _ = add_venue_with_show()
+    long_ago = datetime(2000, 1, 1)
+    with db.engine.begin() as conn:
+        conn.execute(update(Venue.__table__).values(updated_at=long_ago))
+    venue = db.session.get(Venue, venue_id)
+    venue.genres = ['Blues']
+    db.session.commit()
+    assert db.session.get(Venue, venue_id).updated_at > long_ago
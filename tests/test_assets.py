@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import os
+import shutil
+
+from flask import Flask
+
+import assets
+from conftest import ROOT
+
+
+def build(tmp_path):
+    static = tmp_path / 'static'
+    shutil.copytree(os.path.join(ROOT, 'static'), static, ignore=shutil.ignore_patterns('dist'))
+    return static, assets.Builder(str(static)).build()
+
+
+def test_build_writes_fingerprinted_compressed_bundles(tmp_path):
+    static, manifest = build(tmp_path)
+    dist = static / 'dist'
+
+    assert set(assets.BUNDLES) | set(assets.FILES) <= set(manifest)
+    for name, target in manifest.items():
+        data = (dist / target).read_bytes()
+        assert target == assets.fingerprinted(name, data)
+        assert hashlib.sha256(data).hexdigest()[:12] in target
+    css = (dist / manifest['main.css']).read_bytes()
+    assert gzip.decompress((dist / (manifest['main.css'] + '.gz')).read_bytes()) == css
+    # Fonts and images the CSS names are copied and pointed at
+    for url in assets.CSS_URL.findall(css.decode()):
+        path = url[1].split('?')[0].split('#')[0]
+        if not path.startswith(('data:', '../', '/')):
+            assert (dist / path).is_file()
+    assert not (dist / (manifest['img/front-splash.jpg'] + '.gz')).exists()
+
+
+def test_bundles_are_served_precompressed_and_immutable(tmp_path):
+    static, manifest = build(tmp_path)
+    probe = Flask('probe', static_folder=str(static))
+    assets.init_app(probe)
+    client = probe.test_client()
+    with probe.test_request_context():
+        url = assets.asset_url('main.css')
+    assert url == '/static/dist/' + manifest['main.css']
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    plain = client.get(url)
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert 'Content-Encoding' not in plain.headers
+    for response in (compressed, plain):
+        assert response.mimetype == 'text/css'
+        assert response.cache_control.immutable and response.cache_control.public
+        assert response.cache_control.max_age == assets.MAX_AGE
+        assert 'Accept-Encoding' in response.vary
+    assert client.get('/static/dist/../css/main.css').status_code == 404
+    assert client.get('/static/dist/missing.css').status_code == 404
+
+
+def test_without_a_build_pages_use_the_sources(tmp_path):
+    probe = Flask('probe', static_folder=str(tmp_path / 'static'))
+    assets.init_app(probe)
+    with probe.test_request_context():
+        assert assets.asset_urls('head.js') == [
+            '/static/js/libs/modernizr-2.8.2.min.js', '/static/js/libs/moment.min.js']
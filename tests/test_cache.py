@@ -0,0 +1,78 @@
+from flask import Flask, flash, get_flashed_messages, request
+
+from cache import ResponseCache
+
+
+def probe():
+    # A bare app with a working in-process cache; the tests' app runs uncached
+    app = Flask('probe')
+    app.config.update(SECRET_KEY='test-secret', CACHE_TYPE='simple')
+    cache = ResponseCache(app)
+    calls = []
+
+    @app.route('/venues/<int:venue_id>')
+    @cache.cached('venue:{venue_id}')
+    def show_venue(venue_id):
+        calls.append(venue_id)
+        # As layouts/main.html does, the page shows the pending messages
+        messages = get_flashed_messages()
+        if 'saved' in request.args:
+            flash('Venue was successfully listed!')
+        return f'venue {venue_id} render {len(calls)} {messages}'
+
+    @app.route('/venues/<int:venue_id>/save')
+    def save_venue(venue_id):
+        flash('Venue was successfully listed!')
+        cache.invalidate(f'venue:{venue_id}')
+        return 'saved'
+
+    @app.route('/notice')
+    def notice():
+        flash('Venue was successfully listed!')
+        return 'flashed'
+
+    return app, cache, calls
+
+
+def test_stats_are_off_unless_enabled(app, client, monkeypatch):
+    assert client.get('/cache/stats').status_code == 404
+
+    monkeypatch.setitem(app.config, 'CACHE_STATS', True)
+    response = client.get('/cache/stats')
+    assert response.status_code == 200
+    assert 'hits' in response.get_json()
+
+
+def test_cached_pages_are_reused_until_invalidated():
+    app, cache, calls = probe()
+    client = app.test_client()
+
+    first = client.get('/venues/1').data
+    assert client.get('/venues/1').data == first
+    assert client.get('/venues/2').data != first
+    client.get('/venues/1/save')
+    client.get('/venues/2')  # shows the pending message, uncached
+    assert client.get('/venues/1').data == b'venue 1 render 4 []'
+    assert client.get('/venues/2').data == b'venue 2 render 2 []'
+
+    assert calls == [1, 2, 2, 1]
+    assert cache.counters()['hits'] == 2
+
+
+def test_flashed_responses_bypass_the_cache():
+    app, cache, calls = probe()
+    client = app.test_client()
+    client.get('/venues/1')
+
+    # A message waiting in the session is rendered into the next page,
+    # which is not served from the cache nor stored
+    client.get('/notice')
+    assert b'successfully listed' in client.get('/venues/1').data
+    assert client.get('/venues/1').data == b'venue 1 render 1 []'
+    # A view that flashes while rendering is not stored either
+    client.get('/venues/1?saved=1')
+    get_flashed = client.get('/venues/2')
+    client.get('/venues/1?saved=1')
+
+    assert b'successfully listed' in get_flashed.data
+    assert calls == [1, 1, 1, 2, 1]
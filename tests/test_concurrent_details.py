@@ -0,0 +1,50 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app import db
+from asgi import application
+from models import Venue, Artist, Show
+from queries import detail
+
+
+def add_bookings():
+    venue = Venue(name='The Hop', genres=['Jazz'])
+    artist = Artist(name='Guns N Petals')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    now = datetime.now()
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id, start_time=now + timedelta(days=days))
+                       for days in (-2, -1, 3))
+    db.session.commit()
+    return venue.id, artist.id, now
+
+
+def test_concurrent_reads_match_sequential(app):
+    venue_id, artist_id, now = add_bookings()
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id), (Venue, 999)):
+        sequential = detail(model, entity_id, now=now)
+        concurrent = detail(model, entity_id, concurrent=True, threads=2, now=now)
+        assert concurrent == sequential
+    entity, genres, past, upcoming = detail(Venue, venue_id, concurrent=True, now=now)
+    assert (entity.name, genres, len(past), len(upcoming)) == ('The Hop', ['Jazz'], 2, 1)
+
+
+def test_asgi_entry_point_serves_the_pages(app, monkeypatch):
+    venue_id, _, _ = add_bookings()
+    monkeypatch.setitem(app.config, 'CONCURRENT_DETAIL_QUERIES', True)
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': f'/venues/{venue_id}', 'raw_path': b'', 'query_string': b'',
+             'root_path': '', 'headers': [(b'host', b'localhost')], 'server': ('localhost', 80)}
+    asyncio.run(application(scope, receive, send))
+
+    assert sent[0]['status'] == 200
+    body = b''.join(message.get('body', b'') for message in sent[1:]).decode()
+    assert 'The Hop' in body and '1 Upcoming Show' in body
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+
+from app import app as fyyur_app
+from db_pool import TimedQueuePool, pool_stats
+from models import engine_options
+
+
+def test_stats_are_off_unless_enabled(app, client, monkeypatch):
+    assert client.get('/db/stats').status_code == 404
+
+    monkeypatch.setitem(app.config, 'DB_STATS', True)
+    response = client.get('/db/stats')
+    assert response.status_code == 200
+    assert 'pool_class' in response.get_json()
+
+
+def test_engine_options_come_from_config():
+    config = dict(fyyur_app.config, SQLALCHEMY_DATABASE_URI='postgresql://db/fyyur',
+                  DB_POOL_SIZE=8, DB_MAX_OVERFLOW=2, DB_POOL_TIMEOUT=5, DB_POOL_RECYCLE=600,
+                  DB_POOL_PRE_PING=False, DB_STATEMENT_TIMEOUT=1500)
+    options = engine_options(config)
+    assert options['poolclass'] is TimedQueuePool
+    assert (options['pool_size'], options['max_overflow'], options['pool_timeout'],
+            options['pool_recycle'], options['pool_pre_ping']) == (8, 2, 5, 600, False)
+    assert options['connect_args'] == {'options': '-c statement_timeout=1500'}
+    # SQLite keeps its own pool
+    assert engine_options(dict(config, SQLALCHEMY_DATABASE_URI='sqlite://')) == {}
+
+
+def test_pool_counts_checkouts_and_failed_waits(tmp_path):
+    engine = create_engine('sqlite:///' + str(tmp_path / 'pool.db'), poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = engine.connect()
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    held.close()
+    with engine.connect():
+        pass
+
+    stats = pool_stats(engine)
+    assert (stats['pool_class'], stats['size'], stats['checked_out']) == ('TimedQueuePool', 1, 0)
+    assert (stats['checkouts'], stats['failed_checkouts']) == (3, 1)
+    assert stats['wait_seconds_max'] >= 0.05
+    engine.dispose()
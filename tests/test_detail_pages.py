@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import Venue, Artist, Show
+
+
+def add_bookings(shows):
+    # A venue and an artist with `shows` shows, half of them past
+    venue = Venue(name=f'The Hop {shows}', genres=['Jazz'])
+    artist = Artist(name=f'Guns N Petals {shows}')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    now = datetime.now()
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=now + timedelta(days=i - shows // 2, hours=1))
+                       for i in range(shows))
+    db.session.commit()
+    return venue.id, artist.id
+
+
+def test_detail_pages_run_the_same_statements_however_many_shows(client, statements):
+    counts = []
+    for shows in (4, 20):
+        venue_id, artist_id = add_bookings(shows)
+        for path in (f'/venues/{venue_id}', f'/artists/{artist_id}'):
+            statements.clear()
+            page = client.get(path).get_data(as_text=True)
+            counts.append(len(statements))
+            assert f'{shows // 2} Upcoming Shows' in page and f'{shows // 2} Past Shows' in page
+    assert counts[:2] == counts[2:]
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from exporter import export_all
+from importer import import_file
+from models import Venue, Artist, Show
+
+
+def quiet(message):
+    pass
+
+
+def add_catalogue():
+    links = dict(image_link='http://example.com/a.png', facebook_link='http://example.com/f',
+                 website_link='http://example.com', seeking_description='Always', phone='555-0100')
+    venue = Venue(name='The Hop', city='Austin', state='TX', address='1 Main St',
+                  genres=['Jazz', 'Folk'], seeking_talent=True, **links)
+    artist = Artist(name='Guns N Petals', city='Austin', state='TX', genres=['Rock n Roll'],
+                    seeking_venue=False, **links)
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    db.session.add_all([
+        Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2031, 5, 1, 20, 30)),
+        Show(venue_id=venue.id, artist_id=artist.id,
+             start_time=datetime(2019, 5, 1, 21, 0, 0, 250000)),
+    ])
+    db.session.commit()
+
+
+def snapshot():
+    venues = [(v.id, v.name, sorted(v.genres), v.seeking_talent) for v in Venue.query.order_by(Venue.id)]
+    artists = [(a.id, a.name, sorted(a.genres), a.seeking_venue) for a in Artist.query.order_by(Artist.id)]
+    shows = [(s.id, s.venue_id, s.artist_id, s.start_time) for s in Show.query.order_by(Show.id)]
+    return venues, artists, shows
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_export_imports_back(app, tmp_path, fmt):
+    add_catalogue()
+    before = snapshot()
+    export_all(['venues', 'artists', 'shows'], fmt, str(tmp_path), False, 100, echo=quiet)
+    for model in (Show, Venue, Artist):
+        for instance in model.query:
+            db.session.delete(instance)
+    db.session.commit()
+
+    for kind, rows in zip(('venues', 'artists', 'shows'), before):
+        path = str(tmp_path / f'{kind}.{fmt}')
+        state = import_file(kind, path, fmt, 100, False, path + '.checkpoint',
+                            path + '.errors.ndjson', echo=quiet)
+        assert (state['inserted'], state['rejected']) == (len(rows), 0)
+
+    assert snapshot() == before
+
+
+def test_incremental_export_picks_up_later_writes(app, tmp_path):
+    db.session.add(Venue(name='Old Venue'))
+    db.session.commit()
+    db.session.execute(update(Venue).values(updated_at=datetime(2020, 1, 1)))
+    db.session.commit()
+
+    first = export_all(['venues'], 'ndjson', str(tmp_path / 'full'), False, 100, echo=quiet)
+    db.session.add(Venue(name='New Venue'))
+    db.session.commit()
+    since = datetime.fromisoformat(first['started_at'])
+    second = export_all(['venues'], 'ndjson', str(tmp_path / 'since'), False, 100, since=since,
+                        echo=quiet)
+
+    assert first['tables']['venues']['rows'] == 1
+    with open(second['tables']['venues']['path']) as f:
+        assert [json.loads(line)['name'] for line in f] == ['New Venue']
+    # The watermark comes from the database's clock, like updated_at
+    assert datetime.fromisoformat(second['started_at']) >= since
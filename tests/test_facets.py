@@ -0,0 +1,42 @@
+from app import db
+from facets import Filters, browse_query, facet_counts, rebuild
+from models import Venue, Artist, Genre, FacetCount
+
+
+def stored_counts():
+    return sorted((row.kind, row.genre_id, row.city, row.state, row.seeking, row.count)
+                  for row in FacetCount.query.filter(FacetCount.count > 0))
+
+
+def add(model, **fields):
+    instance = model(**fields)
+    db.session.add(instance)
+    db.session.commit()
+    return instance
+
+
+def test_counts_follow_writes_and_match_browsing(app):
+    hop = add(Venue, name='The Hop', city='San Francisco', state='CA', genres=['Jazz', 'Folk'],
+              seeking_talent=True)
+    square = add(Venue, name='Park Square', city='San Francisco', state='CA', genres=['Jazz'])
+    add(Venue, name='Dueling Pianos', city='New York', state='NY', genres=['Folk'])
+    add(Artist, name='Guns N Petals', city='San Francisco', state='CA', genres=['Jazz'],
+        seeking_venue=True)
+    hop.city, hop.state, hop.genres = 'New York', 'NY', ['Jazz']
+    square.seeking_talent = True
+    db.session.commit()
+    db.session.delete(db.session.get(Venue, square.id))
+    db.session.commit()
+
+    maintained = stored_counts()
+    rebuild(db.session.connection())
+    db.session.commit()
+    assert maintained == stored_counts()
+
+    jazz = Genre.query.filter_by(name='Jazz').one()
+    for filters in (Filters(None, None, None, None), Filters(jazz.id, None, None, None),
+                    Filters(None, 'New York', 'NY', True), Filters(jazz.id, None, None, False)):
+        assert facet_counts(Venue, filters).total == browse_query(Venue, filters).count()
+    counts = facet_counts(Venue, Filters(None, 'New York', 'NY', None))
+    assert [(g.name, g.total) for g in counts.genres] == [('Folk', 1), ('Jazz', 1)]
+    assert [(c.city, c.total) for c in counts.cities] == [('New York', 2)]
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import babel.dates
+import pytest
+
+from app import db, format_datetime
+from models import Venue, Artist, Show
+
+
+WHEN = datetime(2035, 4, 1, 20, 5)
+
+
+@pytest.mark.parametrize('format, pattern', [
+    ('full', "EEEE MMMM, d, y 'at' h:mma"),
+    ('medium', 'EE MM, dd, y h:mma'),
+    ('yyyy-MM-dd', 'yyyy-MM-dd'),
+])
+def test_matches_babel_for_datetimes_and_strings(format, pattern):
+    expected = babel.dates.format_datetime(WHEN, pattern, locale='en')
+    assert format_datetime(WHEN, format) == expected
+    # Strings, as the templates used to get, still go through dateutil
+    assert format_datetime(str(WHEN), format) == expected
+
+
+def test_shows_page_formats_start_times(app, client):
+    venue, artist = Venue(name='The Hop'), Artist(name='Guns N Petals')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=WHEN))
+    db.session.commit()
+    assert format_datetime(WHEN, 'full') in client.get('/shows').get_data(as_text=True)
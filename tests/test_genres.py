@@ -0,0 +1,37 @@
+from app import db
+from models import Venue, Artist, Genre
+from queries import genre_facets
+
+
+def add_catalogue():
+    # One at a time, as the forms create them: Genre.named finds the rows
+    # the earlier ones inserted
+    for model, name, genres in ((Venue, 'The Hop', ['Jazz', 'Folk']),
+                                (Artist, 'Guns N Petals', ['Jazz']),
+                                (Venue, 'Park Square', ['Jazz'])):
+        db.session.add(model(name=name, genres=genres))
+        db.session.commit()
+
+
+def test_genres_are_shared_rows(app):
+    add_catalogue()
+
+    assert [name for (name,) in db.session.query(Genre.name).order_by(Genre.name)] == ['Folk', 'Jazz']
+    assert [(g.name, g.venue_count, g.artist_count) for g in genre_facets()] == [
+        ('Folk', 1, 0), ('Jazz', 2, 1)]
+    hop = Venue.query.filter_by(name='The Hop').one()
+    hop.genres = ['Folk']
+    db.session.commit()
+    assert [(g.name, g.venue_count) for g in genre_facets()] == [('Folk', 1), ('Jazz', 1)]
+
+
+def test_genre_pages_list_only_that_genre(app, client):
+    add_catalogue()
+    folk = Genre.query.filter_by(name='Folk').one()
+
+    venues = client.get(f'/genres/{folk.id}/venues').get_data(as_text=True)
+    artists = client.get(f'/genres/{folk.id}/artists').get_data(as_text=True)
+
+    assert 'The Hop' in venues and 'Park Square' not in venues
+    assert 'Guns N Petals' not in artists
+    assert client.get('/genres/999/venues').status_code == 404
@@ -0,0 +1,54 @@
+import os
+import runpy
+
+import config
+from conftest import ROOT
+
+
+class Log(object):
+    def __init__(self):
+        self.lines = []
+
+    def info(self, message, *args):
+        self.lines.append(('info', message % args))
+
+    def warning(self, message, *args):
+        self.lines.append(('warning', message % args))
+
+
+class Server(object):
+    def __init__(self):
+        self.log = Log()
+
+
+def load(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+
+
+def test_settings_come_from_the_environment(monkeypatch):
+    settings = load(monkeypatch, WEB_CONCURRENCY='3', GUNICORN_WORKER_CLASS='sync',
+                    GUNICORN_MAX_REQUESTS='0', PORT='9000')
+
+    assert (settings['workers'], settings['worker_class'], settings['max_requests']) == (3, 'sync', 0)
+    assert settings['bind'] == '0.0.0.0:9000'
+    assert settings['preload_app'] is False
+
+
+def test_startup_logs_connection_budget(monkeypatch):
+    settings = load(monkeypatch, WEB_CONCURRENCY='2', GUNICORN_WORKER_CLASS='gthread',
+                    GUNICORN_THREADS=str(config.DB_POOL_SIZE + 1))
+    server = Server()
+
+    settings['on_starting'](server)
+
+    per_worker = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+    (level, budget), (warned, pool) = server.log.lines[:2]
+    assert level == 'info' and f'up to {2 * per_worker} database connections' in budget
+    assert warned == 'warning' and 'below GUNICORN_THREADS' in pool
+
+
+def test_wsgi_exposes_the_app():
+    from app import app
+    assert runpy.run_path(os.path.join(ROOT, 'wsgi.py'))['app'] is app
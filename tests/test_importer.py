@@ -0,0 +1,69 @@
+import json
+
+from app import db
+from exporter import export_all
+from importer import import_file
+from models import Venue
+
+
+def venue(**fields):
+    record = dict(name='The Dive', city='Austin', state='TX', address='1 Main St',
+                  phone='512-555-0100', genres=['Jazz'], image_link='http://example.com/a.png',
+                  facebook_link='http://example.com/dive', website_link='http://example.com',
+                  seeking_description='Bands on weekdays')
+    record.update(fields)
+    return record
+
+
+def run_import(tmp_path, path, fmt):
+    return import_file('venues', str(path), fmt, 2, False,
+                       str(tmp_path / 'checkpoint'), str(tmp_path / 'errors.ndjson'),
+                       echo=lambda message: None)
+
+
+def test_csv_round_trip_keeps_unchecked_boxes(app, tmp_path):
+    db.session.add_all([Venue(**venue(name='Closed', seeking_talent=False)),
+                        Venue(**venue(name='Open', seeking_talent=True, genres=['Folk']))])
+    db.session.commit()
+    export_all(['venues'], 'csv', str(tmp_path), False, 100, echo=lambda message: None)
+    for instance in db.session.query(Venue):
+        db.session.delete(instance)
+    db.session.commit()
+
+    state = run_import(tmp_path, tmp_path / 'venues.csv', 'csv')
+
+    assert (state['inserted'], state['rejected']) == (2, 0)
+    seeking = dict(db.session.query(Venue.name, Venue.seeking_talent))
+    assert seeking == {'Closed': False, 'Open': True}
+
+
+def test_bad_ndjson_lines_are_reported_not_fatal(app, tmp_path):
+    path = tmp_path / 'venues.ndjson'
+    path.write_text('\n'.join([json.dumps(venue(name='First')), '{"name": "Broken',
+                               '["not", "an", "object"]', json.dumps(venue(name='Last'))]) + '\n')
+
+    state = run_import(tmp_path, path, 'ndjson')
+
+    assert (state['inserted'], state['rejected'], state['position']) == (2, 2, 4)
+    assert sorted(name for (name,) in db.session.query(Venue.name)) == ['First', 'Last']
+    report = [json.loads(line) for line in (tmp_path / 'errors.ndjson').read_text().splitlines()]
+    assert [(entry['batch'], entry['record']) for entry in report] == [(1, 2), (2, 3)]
+    assert json.loads((tmp_path / 'checkpoint').read_text())['position'] == 4
+
+
+def test_batch_mixing_explicit_and_serial_ids(app, tmp_path):
+    path = tmp_path / 'venues.ndjson'
+    path.write_text('\n'.join(json.dumps(record) for record in [
+        venue(name='Numbered', id=10), venue(name='Unnumbered'),
+        venue(name='Bad id', id='abc'), venue(name='Also numbered', id='12')]) + '\n')
+
+    state = import_file('venues', str(path), 'ndjson', 10, False, str(tmp_path / 'checkpoint'),
+                        str(tmp_path / 'errors.ndjson'), echo=lambda message: None)
+
+    assert (state['inserted'], state['rejected']) == (3, 1)
+    ids = dict(db.session.query(Venue.name, Venue.id))
+    assert (ids['Numbered'], ids['Also numbered']) == (10, 12)
+    assert ids['Unnumbered'] not in (10, 12)
+    assert db.session.get(Venue, 10).genres == ['Jazz']
+    report = [json.loads(line) for line in (tmp_path / 'errors.ndjson').read_text().splitlines()]
+    assert report == [{'batch': 1, 'record': 3, 'errors': {'id': ['Must be an integer.']}}]
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from models import Venue, Artist, Show
+
+
+# The shows queries behind the venue/artist pages and the /shows listing,
+# with the index SQLite's planner should pick for each
+PLANS = [
+    ('SELECT start_time, artist_id FROM shows WHERE venue_id = :id AND start_time > :now',
+     'ix_shows_venue_id_start_time'),
+    ('SELECT start_time, venue_id FROM shows WHERE artist_id = :id AND start_time > :now',
+     'ix_shows_artist_id_start_time'),
+    ('SELECT id, start_time FROM shows WHERE (start_time, id) > (:now, 0) '
+     'ORDER BY start_time, id LIMIT 21', 'ix_shows_start_time_id'),
+]
+
+
+@pytest.mark.parametrize('sql, index', PLANS)
+def test_show_queries_use_their_index(app, sql, index):
+    venue, artist = Venue(name='The Hop'), Artist(name='Guns N Petals')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    now = datetime.now()
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id, start_time=now + timedelta(days=i))
+                       for i in range(-50, 50))
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+
+    plan = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql), {'id': venue.id, 'now': now}).all()
+    assert any(index in row[-1] for row in plan), plan
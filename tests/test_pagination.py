@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import Venue
+from pagination import paginate
+
+
+def test_keyset_pages_visit_every_row_once_in_name_order(app):
+    # Duplicate names make the id tie-breaker matter
+    names = ['Cafe', 'Annex', 'Cafe', 'Bar', 'Annex', 'Dome', 'Cafe', 'Bar', 'Echo']
+    db.session.add_all(Venue(name=name) for name in names)
+    db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = paginate(db.session.query(Venue.id, Venue.name), Venue.name, Venue.id,
+                        after=cursor, limit=2)
+        seen.extend((row.name, row.id) for row in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == sorted(db.session.query(Venue.name, Venue.id).all())
+
+
+def test_venue_name_is_required(app):
+    db.session.add(Venue(city='Austin'))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from profiling import Histogram, Profiler
+
+
+@pytest.fixture
+def profiled():
+    # A bare app, so the profiler's hooks do not stay on the real one
+    probe = Flask('probe')
+    probe.config.update(PROFILING=True, PROFILING_SLOW_REQUEST_MS=0)
+    engine = create_engine('sqlite://')
+
+    @probe.route('/shows/<int:count>')
+    def shows(count):
+        with engine.connect() as connection:
+            for _ in range(count):
+                connection.execute(text('SELECT 1'))
+        return 'ok'
+
+    profiler = Profiler(probe)
+    yield probe, profiler
+    event.remove(Engine, 'before_cursor_execute', profiler._before_cursor_execute)
+    event.remove(Engine, 'after_cursor_execute', profiler._after_cursor_execute)
+
+
+def test_metrics_count_requests_and_queries(profiled, caplog):
+    probe, profiler = profiled
+    client = probe.test_client()
+    with caplog.at_level(logging.WARNING, logger=probe.logger.name):
+        assert client.get('/shows/3').status_code == 200
+    client.get('/missing')
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+
+    assert 'fyyur_request_duration_seconds_count{endpoint="shows",method="GET",status="200"} 1' in metrics
+    assert 'fyyur_request_duration_seconds_count{endpoint="unmatched",method="GET",status="404"} 1' in metrics
+    assert 'fyyur_request_db_queries_bucket{endpoint="shows",method="GET",le="2"} 0' in metrics
+    assert 'fyyur_request_db_queries_bucket{endpoint="shows",method="GET",le="3"} 1' in metrics
+    assert 'fyyur_request_db_queries_sum{endpoint="shows",method="GET"} 3.000000' in metrics
+    assert any('Slow request GET /shows/3' in record.getMessage() and '3 queries' in record.getMessage()
+               for record in caplog.records)
+
+
+def test_profiling_off_registers_nothing():
+    probe = Flask('probe')
+    Profiler(probe)
+    assert probe.extensions['profiler'] is not None
+    assert 'metrics' not in probe.view_functions
+    assert probe.before_request_funcs == {}
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency', 'Latency.', ('route',), (1, 5))
+    for value in (0.5, 1, 3, 9):
+        histogram.observe(('home',), value)
+    assert histogram.render()[2:] == [
+        'latency_bucket{route="home",le="1"} 2',
+        'latency_bucket{route="home",le="5"} 3',
+        'latency_bucket{route="home",le="+Inf"} 4',
+        'latency_sum{route="home"} 13.500000',
+        'latency_count{route="home"} 4',
+    ]
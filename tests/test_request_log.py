@@ -0,0 +1,47 @@
+import importlib
+import json
+import os
+
+from flask import Flask
+
+from conftest import ROOT
+from request_log import RequestLog
+
+
+def test_requests_are_logged_for_replay(tmp_path, monkeypatch):
+    path = tmp_path / 'requests.ndjson'
+    probe = Flask('probe')
+    probe.config['REQUEST_LOG_FILE'] = str(path)
+    probe.add_url_rule('/venues/<int:venue_id>', 'show_venue', lambda venue_id: 'venue')
+    probe.add_url_rule('/venues/create', 'create_venue', lambda: 'created', methods=['POST'])
+    log = RequestLog(probe)
+    client = probe.test_client()
+
+    client.get('/venues/7?page=2')
+    client.post('/venues/create', data={'name': 'The Hop', 'genres': ['Jazz', 'Folk'],
+                                        'csrf_token': 'secret'})
+    client.get('/missing/3')
+    log.file.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(e['method'], e['path'], e['endpoint'], e['status']) for e in lines] == [
+        ('GET', '/venues/7?page=2', 'show_venue', 200),
+        ('POST', '/venues/create', 'create_venue', 200),
+        ('GET', '/missing/3', None, 404),
+    ]
+    assert lines[0]['form'] is None
+    assert lines[1]['form'] == {'name': ['The Hop'], 'genres': ['Jazz', 'Folk']}
+
+    monkeypatch.syspath_prepend(os.path.join(ROOT, 'benchmarks'))
+    replay = importlib.import_module('replay')
+    with open(path, 'a') as f:
+        f.write('\n{"note": "not a request"}\n')
+    entries = replay.load_log(str(path))
+    assert [replay.route_of(entry) for entry in entries] == [
+        'GET show_venue', 'POST create_venue', 'GET /missing/<id>']
+
+
+def test_no_file_no_hooks():
+    probe = Flask('probe')
+    RequestLog(probe)
+    assert probe.after_request_funcs == {}
@@ -0,0 +1,38 @@
+from sqlalchemy import insert, update
+
+import search
+from app import db
+from models import Venue
+
+
+def names(hits):
+    return [hit.name for hit in hits]
+
+
+def test_fallback_index_sees_writes_that_bypass_the_session(app):
+    db.session.add(Venue(name='Blue Moon'))
+    db.session.commit()
+    assert names(search.search_by_name(Venue, 'moon')) == ['Blue Moon']
+
+    # As `flask import`, the seeder or another worker would: no ORM events here
+    with db.engine.begin() as conn:
+        conn.execute(insert(Venue.__table__), [{'name': 'Moonlight Hall'}])
+    assert sorted(names(search.search_by_name(Venue, 'moon'))) == ['Blue Moon', 'Moonlight Hall']
+
+    with db.engine.begin() as conn:
+        conn.execute(Venue.__table__.delete().where(Venue.__table__.c.name == 'Blue Moon'))
+    assert names(search.search_by_name(Venue, 'moon')) == ['Moonlight Hall']
+
+
+def test_fallback_index_expires(app, monkeypatch):
+    db.session.add(Venue(name='Red Room'))
+    db.session.commit()
+    assert names(search.search_by_name(Venue, 'room')) == ['Red Room']
+
+    # A rename that leaves count, max id and updated_at as they were
+    with db.engine.begin() as conn:
+        conn.execute(update(Venue.__table__).values(
+            name='Red Hall', updated_at=Venue.__table__.c.updated_at))
+    assert names(search.search_by_name(Venue, 'room')) == ['Red Room']
+    monkeypatch.setattr(search, 'NGRAM_INDEX_MAX_AGE', -1)
+    assert names(search.search_by_name(Venue, 'room')) == []
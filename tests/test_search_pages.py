@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import Venue, Artist, Show
+
+
+def add_music_venues(count):
+    artist = Artist(name=f'Artist {count}')
+    venues = [Venue(name=f'Live Music Hall {count}-{i}') for i in range(count)]
+    db.session.add_all([artist] + venues)
+    db.session.flush()
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=datetime.now() + timedelta(days=1)) for venue in venues)
+    db.session.commit()
+
+
+def test_venue_search_renders_every_hit_in_fixed_statements(client, statements):
+    counts = []
+    for count in (2, 6):
+        add_music_venues(count)
+        statements.clear()
+        page = client.post('/venues/search', data={'search_term': 'music'}).get_data(as_text=True)
+        counts.append(len(statements))
+        for venue in Venue.query.filter(Venue.name.like('Live Music Hall%')):
+            assert venue.name in page
+    assert counts[0] == counts[1]
+
+
+def test_artist_search_renders_every_hit(client):
+    db.session.add_all(Artist(name=name) for name in ('Guns N Petals', 'Matt Quevedo', 'The Wild Sax Band'))
+    db.session.commit()
+    page = client.post('/artists/search', data={'search_term': 'a'}).get_data(as_text=True)
+    assert all(name in page for name in ('Guns N Petals', 'Matt Quevedo', 'The Wild Sax Band'))
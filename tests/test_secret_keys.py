@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+# Each side runs in its own process, as two deploys would: config.py reads
+# the keys from the environment when the app is imported
+SCRIPT = '''
+import json, sys
+from flask import session
+from flask_wtf.csrf import generate_csrf, validate_csrf
+from wtforms.validators import ValidationError
+from app import app
+
+serializer = app.session_interface.get_signing_serializer(app)
+if sys.argv[1] == 'issue':
+    with app.test_request_context():
+        token = generate_csrf()
+        session['marker'] = 'kept'
+        print(json.dumps({'token': token, 'cookie': serializer.dumps(dict(session))}))
+else:
+    issued = json.load(sys.stdin)
+    cookie = '%s=%s' % (app.config['SESSION_COOKIE_NAME'], issued['cookie'])
+    with app.test_request_context(headers={'Cookie': cookie}):
+        try:
+            validate_csrf(issued['token'])
+            csrf = None
+        except ValidationError as e:
+            csrf = str(e)
+        print(json.dumps({'session': session.get('marker') == 'kept', 'csrf': csrf}))
+'''
+
+
+def run(action, keys, stdin=None):
+    env = {name: value for name, value in os.environ.items()
+           if name not in ('SECRET_KEY', 'SECRET_KEY_FILE', 'SECRET_KEY_FALLBACKS')}
+    env.update(keys)
+    done = subprocess.run([sys.executable, '-c', SCRIPT, action], cwd=ROOT, env=env, input=stdin,
+                          capture_output=True, text=True, check=True)
+    return done.stdout
+
+
+@pytest.fixture(scope='module')
+def issued():
+    return run('issue', {'SECRET_KEY': 'old-key'})
+
+
+def validate(issued, keys):
+    return json.loads(run('validate', keys, stdin=issued))
+
+
+def test_same_key_accepts(issued):
+    assert validate(issued, {'SECRET_KEY': 'old-key'}) == {'session': True, 'csrf': None}
+
+
+def test_rotated_key_accepts_through_fallbacks(issued):
+    keys = {'SECRET_KEY': 'new-key', 'SECRET_KEY_FALLBACKS': 'older-key, old-key'}
+    assert validate(issued, keys) == {'session': True, 'csrf': None}
+
+
+def test_rotated_key_accepts_through_key_file(issued, tmp_path):
+    key_file = tmp_path / 'keys'
+    key_file.write_text('new-key\nold-key\n')
+    assert validate(issued, {'SECRET_KEY_FILE': str(key_file)}) == {'session': True, 'csrf': None}
+
+
+def test_other_key_rejects(issued):
+    result = validate(issued, {'SECRET_KEY': 'new-key'})
+    assert result['session'] is False
+    assert result['csrf'] is not None
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+import show_counts
+from app import db
+from models import Venue, Artist, Show
+
+
+def counters(instance):
+    db.session.refresh(instance)
+    return instance.upcoming_show_count, instance.past_show_count, instance.next_show_at
+
+
+def test_show_writes_recount_venue_and_artist(app):
+    venue, other_venue = Venue(name='The Hop'), Venue(name='Park Square')
+    artist = Artist(name='Guns N Petals')
+    db.session.add_all([venue, other_venue, artist])
+    db.session.flush()
+    soon = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    past = Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2019, 5, 21))
+    upcoming = Show(venue_id=venue.id, artist_id=artist.id, start_time=soon)
+    db.session.add_all([past, upcoming])
+    db.session.commit()
+    assert counters(venue) == (1, 1, soon)
+    assert counters(artist) == (1, 1, soon)
+
+    upcoming.venue_id = other_venue.id
+    db.session.commit()
+    assert counters(venue) == (0, 1, None)
+    assert counters(other_venue) == (1, 0, soon)
+
+    db.session.delete(past)
+    db.session.commit()
+    assert counters(artist) == (1, 0, soon)
+
+
+def test_sweep_command_moves_started_shows(app):
+    venue, artist = Venue(name='The Hop'), Artist(name='Guns N Petals')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                        start_time=datetime.now() + timedelta(days=1)))
+    db.session.commit()
+    # The clock passing the show, as far as the counters can tell
+    db.session.execute(update(Venue).values(next_show_at=datetime.now() - timedelta(minutes=1)))
+    db.session.execute(update(Show).values(start_time=datetime.now() - timedelta(minutes=1)))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['sweep-shows'])
+
+    assert result.exit_code == 0, result.output
+    assert '1 venues, 0 artists recounted' in result.output
+    assert counters(venue) == (0, 1, None)
+
+
+def test_refresh_locks_the_rows_before_recounting():
+    statements = []
+
+    class Recorder(object):
+        def execute(self, statement):
+            statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+    show_counts.refresh(Recorder(), Venue, {3, 1})
+
+    lock, recount = statements
+    assert lock.startswith('SELECT venues.id') and lock.endswith('FOR UPDATE')
+    assert recount.startswith('UPDATE venues')
+
+
+def test_page_requests_do_not_write(app, client, statements):
+    venue, artist = Venue(name='The Hop'), Artist(name='Guns N Petals')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                        start_time=datetime.now() - timedelta(minutes=1)))
+    db.session.commit()
+    db.session.execute(update(Venue).values(next_show_at=datetime.now() - timedelta(minutes=1)))
+    db.session.commit()
+    statements.clear()
+    for path in ('/venues', '/artists', '/shows', f'/venues/{venue.id}'):
+        assert client.get(path).status_code == 200
+    assert [s for s in statements if not s.lstrip().upper().startswith('SELECT')] == []
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import Venue, Artist, Show
+
+
+def add_shows(count):
+    venue = Venue(name=f'Venue {count}', city='Austin', state='TX')
+    artist = Artist(name=f'Artist {count}', city='Austin', state='TX')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    now = datetime.now()
+    db.session.add_all(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=now + timedelta(days=i - count // 2))
+                       for i in range(count))
+    db.session.commit()
+
+
+def test_shows_page_is_one_statement_however_many_shows(client, statements):
+    counts = []
+    for shows in (2, 10, 40):
+        add_shows(shows)
+        statements.clear()
+        assert client.get('/shows').status_code == 200
+        counts.append(len(statements))
+    assert counts == [1, 1, 1]
+
+
+def test_later_shows_pages_are_one_statement(client, statements):
+    add_shows(45)
+    first = client.get('/shows?limit=20').get_data(as_text=True)
+    assert 'after=' in first
+    after = first.split('after=')[1].split('&')[0].split('"')[0]
+    statements.clear()
+    assert client.get(f'/shows?limit=20&after={after}').status_code == 200
+    assert len(statements) == 1
@@ -0,0 +1,43 @@
+import pytest
+from flask import Flask, render_template
+
+import template_cache
+from app import app as fyyur_app
+
+
+def probe(tmp_path, **config):
+    templates = tmp_path / 'templates'
+    templates.mkdir(exist_ok=True)
+    (templates / 'base.html').write_text('<h1>{% block title %}{% endblock %}</h1>')
+    (templates / 'page.html').write_text(
+        '{% extends "base.html" %}{% block title %}{{ name }}{% endblock %}')
+    (templates / 'notes.txt').write_text('not a template')
+    app = Flask('probe', template_folder=str(templates))
+    app.config.update(TEMPLATE_BYTECODE_CACHE=True,
+                      TEMPLATE_BYTECODE_CACHE_DIR=str(tmp_path / 'bytecode'), **config)
+    return app
+
+
+def test_workers_reuse_the_compiled_templates(tmp_path):
+    (tmp_path / 'bytecode').mkdir()
+    first = probe(tmp_path, PRELOAD_TEMPLATES=True)
+    template_cache.init_app(first)
+    assert len(list((tmp_path / 'bytecode').iterdir())) == 2
+
+    second = probe(tmp_path)
+    template_cache.init_app(second)
+
+    def compile(*args, **kwargs):
+        raise AssertionError('compiled again')
+
+    second.jinja_env.compile = compile
+    with second.app_context():
+        assert render_template('page.html', name='The Hop') == '<h1>The Hop</h1>'
+    with pytest.raises(AssertionError):
+        second.jinja_env.from_string('{{ 1 }}')
+
+
+def test_preload_compiles_every_app_template():
+    names = template_cache.preload(fyyur_app)
+    assert 'layouts/main.html' in names and 'pages/home.html' in names
+    assert all(name.endswith('.html') for name in names)
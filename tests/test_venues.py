@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app import app as fyyur_app, db, venue_areas
+from models import Venue, Artist, Show
+
+
+def add_venues():
+    artist = Artist(name='Guns N Petals')
+    hop = Venue(name='The Hop', city='San Francisco', state='CA')
+    square = Venue(name='Park Square', city='San Francisco', state='CA')
+    pianos = Venue(name='Dueling Pianos', city='New York', state='NY')
+    db.session.add_all([artist, hop, square, pianos])
+    db.session.flush()
+    now = datetime.now()
+    db.session.add_all(Show(venue_id=hop.id, artist_id=artist.id, start_time=now + timedelta(days=days))
+                       for days in (-3, 2, 5))
+    db.session.add(Show(venue_id=pianos.id, artist_id=artist.id, start_time=now - timedelta(days=1)))
+    db.session.commit()
+
+
+def test_venue_areas_are_one_statement_with_upcoming_counts(app, statements):
+    add_venues()
+    statements.clear()
+    with fyyur_app.test_request_context('/venues'):
+        areas, _ = venue_areas()
+
+    assert len(statements) == 1
+    assert [(area['city'], area['state'], [(v['name'], v['num_upcoming_shows']) for v in area['venues']])
+            for area in areas] == [
+        ('San Francisco', 'CA', [('Park Square', 0), ('The Hop', 2)]),
+        ('New York', 'NY', [('Dueling Pianos', 0)]),
+    ]
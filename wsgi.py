@@ -0,0 +1,17 @@
+import logging
+
+from app import app, configure_logging
+
+
+# WSGI entry point for production:
+#
+#     gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Under gunicorn the app logs through gunicorn's error log handlers, so all
+# output ends up in one place with one format.
+gunicorn_logger = logging.getLogger('gunicorn.error')
+if gunicorn_logger.handlers:
+    app.logger.handlers = gunicorn_logger.handlers
+configure_logging(app)
+if gunicorn_logger.handlers:
+    app.logger.setLevel(gunicorn_logger.level)